@@ -1,10 +1,16 @@
 import pandas as pd
+import numpy as np
 from typing import List
 from typing import Union
-import itertools
+import collections
+import heapq
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 from actionrules.desiredState import DesiredState
 from actionrules.decisions import Decisions
+from actionrules.pairMatching import PairMatching
 
 
 class ActionRules:
@@ -43,8 +49,10 @@ class ActionRules:
         Maximal number of stable pairs.
     max_flexible_antecedents : int
         Maximal number of flexible pairs.
-    used_indexes : list
+    used_indexes : set
         Already used indexes.
+    used_segment_pairs : set
+        Already used pairs of segments (just for reduction by nan with partitions).
     classification_before : list
         List of before parts of action rules.
     classification_after : list
@@ -63,17 +71,34 @@ class ActionRules:
         Number representing minimal desired change in utility caused by action.
     sort_by_util_dif : bool = False
         Should the output action rules be sorted by utility difference?
+    engine : str = "python"
+        Engine used for pairing of classification rules ("python" or "numpy").
+    partitions : collections.deque = None
+        Reduction tables as lists of positions in segments, they are taken from the left when searched.
+    segments : List[np.ndarray] = None
+        Disjoint arrays of row positions in the base tables.
+    n_jobs : int = 1
+        Number of processes used for partitions.
+    top_k : int = None
+        Number of kept action rules.
+    rank_by : str = "uplift"
+        Value used for top k.
 
     Methods
     -------
     fit(self)
         Train the model.
+    iter_fit(self, is_stored: bool = True)
+        Train the model and yield action rules as soon as they are found.
     pretty_text(self)
         Generate pretty representation of action rules.
     representation(self)
         Generate mathematical representation of action rules.
+    get_rank_value(action_rule: list, rank_by: str) -> float
+        Get the value of an action rule used for ranking.
 
     """
+    RANK_BY = ("uplift", "confidence", "support", "util_dif", "profit")
 
     def __init__(self,
                  stable_tables: List[pd.DataFrame],
@@ -93,7 +118,13 @@ class ActionRules:
                  util_target: List[pd.Series] = None,
                  min_util_dif: float = None,
                  min_profit: float = None,
-                 sort_by_util_dif: bool = False
+                 sort_by_util_dif: bool = False,
+                 engine: str = "python",
+                 partitions: List[List[int]] = None,
+                 segments: List[np.ndarray] = None,
+                 n_jobs: int = 1,
+                 top_k: int = None,
+                 rank_by: str = "uplift"
                  ):
         """
         Parameters
@@ -132,6 +163,22 @@ class ActionRules:
             Number representing minimal profit.
         sort_by_util_dif : bool = False
             Should the output action rules be sorted by utility difference?
+        engine : str = "python"
+            Engine used for pairing of classification rules. "python" checks pair by pair,
+            "numpy" evaluates whole blocks of pairs with PairMatching. Both give the same action rules.
+        partitions : List[List[int]] = None
+            Reduction tables as lists of positions in segments (see Reduction). If it is entered,
+            the lists of tables, supports, confidences and utilities contain just one base item.
+        segments : List[np.ndarray] = None
+            Disjoint arrays of row positions in the base tables, it is used together with partitions.
+        n_jobs : int = 1
+            Number of processes used for partitions, -1 means all cores. The output is the same as
+            from one process.
+        top_k : int = None
+            If it is entered, just the top k action rules by rank_by are kept (sorted from the best).
+            The pairs that cannot get to the top k are skipped before the action rule is created.
+        rank_by : str = "uplift"
+            Value used for top k ("uplift", "confidence", "support", "util_dif" or "profit").
         """
         self.stable_tables = stable_tables
         self.flexible_tables = flexible_tables
@@ -147,7 +194,8 @@ class ActionRules:
         self.min_flexible_antecedents = min_flexible_antecedents
         self.max_stable_antecedents = max_stable_antecedents
         self.max_flexible_antecedents = max_flexible_antecedents
-        self.used_indexes = []
+        self.used_indexes = set()
+        self.used_segment_pairs = set()
         self.classification_before = []
         self.classification_after = []
         self.desired_target_classes = self.desired_state.get_destination_classes()
@@ -159,6 +207,29 @@ class ActionRules:
         self.min_util_dif = min_util_dif
         self.min_profit = min_profit
         self.sort_by_util_dif = sort_by_util_dif
+        if engine not in ("python", "numpy"):
+            raise Exception("Unknown engine " + str(engine))
+        self.engine = engine
+        self.partitions = None
+        if partitions is not None:
+            self.partitions = collections.deque(partitions)
+        self.segments = segments
+        if n_jobs == 0 or n_jobs < -1:
+            raise Exception("Number of jobs must be positive or -1")
+        self.n_jobs = n_jobs
+        if top_k is not None and top_k < 1:
+            raise Exception("Top k must be positive")
+        if rank_by not in self.RANK_BY:
+            raise Exception("Unknown rank_by " + str(rank_by))
+        if rank_by == "util_dif" and min_util_dif is None:
+            raise Exception("Ranking by util_dif needs min_util_dif")
+        if rank_by == "profit" and min_profit is None:
+            raise Exception("Ranking by profit needs min_profit")
+        self.top_k = top_k
+        self.rank_by = rank_by
+        self._rank_threshold = None
+        self._decision_cache = None
+        self._signature_cache = None
 
     def _is_action_couple(self,
                           before: Union[str, int, float],
@@ -252,16 +323,16 @@ class ActionRules:
                 action_rule_part.append([column, action_couple])
         return True, action_rule_part, count_antecedent
 
-    def _add_action_rule(self,
-                         action_rule_stable: list,
-                         action_rule_flexible: list,
-                         action_rule_decision: list,
-                         action_rule_supp: list,
-                         action_rule_conf: list,
-                         uplift: float,
-                         util_dif: float = None,
-                         profit: float = None):
-        """This method joins the parts of an action rule and adds the action rule to a list.
+    @staticmethod
+    def _join_action_rule(action_rule_stable: list,
+                          action_rule_flexible: list,
+                          action_rule_decision: list,
+                          action_rule_supp: list,
+                          action_rule_conf: list,
+                          uplift: float,
+                          util_dif: float = None,
+                          profit: float = None) -> list:
+        """This method joins the parts of an action rule.
 
         Parameters
         ----------
@@ -281,9 +352,14 @@ class ActionRules:
             Utility difference
         profit : float
             Profit
+
+        Returns
+        -------
+        list
+            Action rule with its supports, confidences, uplift, utility difference and profit.
         """
         action_rule = [action_rule_stable, action_rule_flexible, action_rule_decision]
-        self.action_rules.append([action_rule, action_rule_supp, action_rule_conf, uplift, util_dif, profit])
+        return [action_rule, action_rule_supp, action_rule_conf, uplift, util_dif, profit]
 
     def _split_to_before_after_consequent(self, decision_column: pd.DataFrame) -> tuple:
         """This method split the table based on consequent.
@@ -308,146 +384,843 @@ class ActionRules:
 
         return before_frame.index.values, after_frame.index.values
 
-    def fit(self):
-        """It finds all pairs of classification rules and tries to create action rules.
+    def _get_tables(self):
+        """It yields the reduction tables one by one.
+
+        Without partitions, the tables are taken from the lists. With partitions, the lists contain
+        just the base tables and every partition is a list of segments of row positions in them.
+
+        Yields
+        ------
+        tuple
+            Stable, flexible and decision data frames, supports, confidences, utilities and partition
+            (None if the tables are not partitioned).
+        """
+        is_utility = self.min_util_dif is not None or self.min_profit is not None
+        if self.partitions is None:
+            for table in range(len(self.stable_tables)):
+                stable_columns = self.stable_tables.pop(0)
+                flexible_columns = self.flexible_tables.pop(0)
+                decision_column = self.decision_tables.pop(0)
+                supp = self.supp.pop(0)
+                supp = supp.astype(float)
+                conf = self.conf.pop(0)
+                conf = conf.astype(float)
+                util_flex = None
+                if self.util_flex and is_utility:
+                    util_flex = self.util_flex.pop(0)
+                    util_flex = util_flex.astype(float)
+                util_target = None
+                if self.util_target and is_utility:
+                    util_target = self.util_target.pop(0)
+                    util_target = util_target.astype(float)
+                yield (stable_columns, flexible_columns, decision_column, supp, conf, util_flex, util_target,
+                       None)
+        else:
+            base_tables = self._get_base_tables()
+            while self.partitions:
+                partition = self.partitions.popleft()
+                yield base_tables + (partition,)
+
+    def _get_base_tables(self) -> tuple:
+        """Get the base tables of partitions.
+
+        Returns
+        -------
+        tuple
+            Stable, flexible and decision data frames, supports, confidences and utilities.
+        """
+        is_utility = self.min_util_dif is not None or self.min_profit is not None
+        supp = self.supp[0].astype(float)
+        conf = self.conf[0].astype(float)
+        util_flex = None
+        if self.util_flex and is_utility:
+            util_flex = self.util_flex[0].astype(float)
+        util_target = None
+        if self.util_target and is_utility:
+            util_target = self.util_target[0].astype(float)
+        return (self.stable_tables[0], self.flexible_tables[0], self.decision_tables[0], supp, conf, util_flex,
+                util_target)
+
+    def _get_partition_rows(self, partition: list) -> tuple:
+        """Get sorted row positions of a partition and the segment of every row.
+
+        Parameters
+        ----------
+        partition : list
+            Positions of segments.
+
+        Returns
+        -------
+        tuple
+            Row positions in the base tables and position of the segment (in the partition) for every row.
+        """
+        if len(partition) == 1:
+            rows = self.segments[partition[0]]
+            return rows, np.zeros(len(rows), dtype=np.int64)
+        segments = [self.segments[segment_id] for segment_id in partition]
+        rows = np.concatenate(segments)
+        groups = np.repeat(np.arange(len(segments)), [len(segment) for segment in segments])
+        order = np.argsort(rows, kind="stable")
+        return rows[order], groups[order]
 
+    def _get_new_segment_pairs(self, partition: list) -> np.ndarray:
+        """Get the matrix of segment pairs that were not used in previous partitions and mark them as used.
+
+        A partition always contains whole segments, so if two segments were already together in a partition,
+        all pairs of their rows were already used (just for reduction by nan).
+
+        Parameters
+        ----------
+        partition : list
+            Positions of segments.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean matrix (before segment x after segment).
         """
-        for table in range(len(self.stable_tables)):
-            stable_columns = self.stable_tables.pop(0)
-            flexible_columns = self.flexible_tables.pop(0)
-            decision_column = self.decision_tables.pop(0)
-            supp = self.supp.pop(0)
-            supp = supp.astype(float)
-            conf = self.conf.pop(0)
-            conf = conf.astype(float)
-            util_flex = None
-            if self.util_flex and (self.min_util_dif is not None or self.min_profit is not None):
-                util_flex = self.util_flex.pop(0)
-                util_flex = util_flex.astype(float)
-            util_target = None
-            if self.util_target and (self.min_util_dif is not None or self.min_profit is not None):
-                util_target = self.util_target.pop(0)
-                util_target = util_target.astype(float)
+        new_pairs = np.ones((len(partition), len(partition)), dtype=bool)
+        for before, before_segment in enumerate(partition):
+            for after, after_segment in enumerate(partition):
+                if (before_segment, after_segment) in self.used_segment_pairs:
+                    new_pairs[before, after] = False
+                else:
+                    self.used_segment_pairs.add((before_segment, after_segment))
+        return new_pairs
+
+    def _iter_table(self,
+                    pair_matching,
+                    stable_columns: pd.DataFrame,
+                    flexible_columns: pd.DataFrame,
+                    decision_column: pd.DataFrame,
+                    supp: pd.Series,
+                    conf: pd.Series,
+                    util_flex: pd.Series,
+                    util_target: pd.Series,
+                    partition: list,
+                    new_segment_pairs: np.ndarray):
+        """It finds all pairs of classification rules in one reduction table and tries to create action rules.
+
+        The action rules are yielded as soon as they are found.
+
+        Parameters
+        ----------
+        pair_matching : PairMatching or None
+            PairMatching for the numpy engine.
+        stable_columns : pd.DataFrame
+            Data frame with stable attributes.
+        flexible_columns : pd.DataFrame
+            Data frame with flexible attributes.
+        decision_column : pd.DataFrame
+            Data frame with consequent.
+        supp : pd.Series
+            Supports of classification rules.
+        conf : pd.Series
+            Confidences of classification rules.
+        util_flex : pd.Series
+            Utilities of flexible attributes or None.
+        util_target : pd.Series
+            Utilities of consequent or None.
+        partition : list
+            Positions of segments or None (if the tables are not partitioned).
+        new_segment_pairs : np.ndarray
+            Boolean matrix of segment pairs that were not used yet or None.
+
+        Yields
+        ------
+        tuple
+            Action rule, index of the before classification rule and index of the after classification rule.
+        """
+        pair_filter = None
+        if partition is None:
             (before_indexes, after_indexes) = self._split_to_before_after_consequent(decision_column)
-            for comb in itertools.product(before_indexes, after_indexes):
-                # Check if it is not used twice - just for reduction by nan
-                if self.is_nan:
-                    if comb in self.used_indexes:
-                        continue
-                    self.used_indexes.append(comb)
-                rule_before_index = comb[0]
-                rule_after_index = comb[1]
-
-                util_dif = None
-                profit = None
-                if util_flex is not None and util_target is not None:
-                    # utility difference check
-                    if self.min_util_dif is not None:
-                        utility_before = util_flex[rule_before_index] + util_target[rule_before_index]
-                        utility_after = util_flex[rule_after_index] + util_target[rule_after_index]
-                        util_dif = utility_after - utility_before
-                        if self.min_util_dif > util_dif:
-                            continue
-                    # utility profit check
-                    if self.min_profit is not None:
-                        util_flex_before = util_flex[rule_before_index]
-                        util_flex_after = util_flex[rule_after_index]
-                        util_target_before = util_target[rule_before_index]
-                        util_target_after = util_target[rule_after_index]
-                        cost = util_flex_after - util_flex_before
-                        conf_before = conf[rule_before_index]
-                        conf_after = conf[rule_after_index]
-                        benefit = (util_target_after - util_target_before) * (conf_after + conf_before - 1)
-                        # utility values for cost part can be either negative o positive - use of absolute values
-                        # makes it handles it the same
-                        profit = benefit - abs(cost)
-                        if self.min_profit > profit:
-                            continue
-
-                decision_before = decision_column.at[rule_before_index, decision_column.columns[0]]
-                decision_after = decision_column.at[rule_after_index, decision_column.columns[0]]
-                if self.desired_state.is_candidate_decision(decision_before, decision_after):
-                    is_all_stable, action_rule_stable, counted_stable = self._create_action_rules(
-                        stable_columns,
-                        rule_before_index,
-                        rule_after_index,
-                        "stable")
-                    if not is_all_stable:
+        else:
+            rows, groups = self._get_partition_rows(partition)
+            (before_indexes, after_indexes) = self._split_to_before_after_consequent(
+                decision_column.iloc[rows])
+            if self.is_nan:
+                before_groups = groups[np.searchsorted(rows, decision_column.index.get_indexer(before_indexes))]
+                after_groups = groups[np.searchsorted(rows, decision_column.index.get_indexer(after_indexes))]
+                pair_filter = (before_groups, after_groups, new_segment_pairs)
+        if pair_matching is not None:
+            # Already used pairs are skipped by PairMatching
+            candidates = pair_matching.find_pairs(stable_columns,
+                                                  flexible_columns,
+                                                  decision_column,
+                                                  before_indexes,
+                                                  after_indexes,
+                                                  pair_filter)
+        else:
+            candidates = self._get_candidates(stable_columns, flexible_columns, decision_column, before_indexes,
+                                              after_indexes, pair_filter)
+        for comb in candidates:
+            # Check if it is not used twice - just for reduction by nan without partitions
+            if self.is_nan and pair_matching is None and partition is None:
+                if comb in self.used_indexes:
+                    continue
+                self.used_indexes.add(comb)
+            rule_before_index = comb[0]
+            rule_after_index = comb[1]
+
+            util_dif = None
+            profit = None
+            if util_flex is not None and util_target is not None:
+                # utility difference check
+                if self.min_util_dif is not None:
+                    utility_before = util_flex[rule_before_index] + util_target[rule_before_index]
+                    utility_after = util_flex[rule_after_index] + util_target[rule_after_index]
+                    util_dif = utility_after - utility_before
+                    if self.min_util_dif > util_dif:
                         continue
-                    is_all_flexible, action_rule_flexible, counted_flexible = self._create_action_rules(
-                        flexible_columns,
-                        rule_before_index,
-                        rule_after_index,
-                        "flexible")
-                    if not is_all_flexible:
+                # utility profit check
+                if self.min_profit is not None:
+                    util_flex_before = util_flex[rule_before_index]
+                    util_flex_after = util_flex[rule_after_index]
+                    util_target_before = util_target[rule_before_index]
+                    util_target_after = util_target[rule_after_index]
+                    cost = util_flex_after - util_flex_before
+                    conf_before = conf[rule_before_index]
+                    conf_after = conf[rule_after_index]
+                    benefit = (util_target_after - util_target_before) * (conf_after + conf_before - 1)
+                    # utility values for cost part can be either negative o positive - use of absolute values
+                    # makes it handles it the same
+                    profit = benefit - abs(cost)
+                    if self.min_profit > profit:
                         continue
-                    action_rule_decision = [
-                        decision_column.columns[0], [decision_before, decision_after]]
-                    if counted_flexible >= self.min_flexible_antecedents and \
-                            counted_stable >= self.min_stable_antecedents and \
-                            counted_flexible <= self.max_flexible_antecedents and \
-                            counted_stable <= self.max_stable_antecedents:
-                        if not self.is_nan:
-                            support = min(supp[rule_before_index], supp[rule_after_index])
-                            confidence = conf[rule_before_index] * conf[rule_after_index]
-                            uplift = self._get_uplift(
-                                supp[rule_before_index],
-                                conf[rule_before_index],
-                                conf[rule_after_index]
-                            )
+            # pairs that cannot get to the top k action rules
+            if self._rank_threshold is not None and self._get_rank_bound(
+                    supp, conf, rule_before_index, rule_after_index, util_dif, profit) <= self._rank_threshold:
+                continue
+
+            decision_before = decision_column.at[rule_before_index, decision_column.columns[0]]
+            decision_after = decision_column.at[rule_after_index, decision_column.columns[0]]
+            if self.desired_state.is_candidate_decision(decision_before, decision_after):
+                is_all_stable, action_rule_stable, counted_stable = self._create_action_rules(
+                    stable_columns,
+                    rule_before_index,
+                    rule_after_index,
+                    "stable")
+                if not is_all_stable:
+                    continue
+                is_all_flexible, action_rule_flexible, counted_flexible = self._create_action_rules(
+                    flexible_columns,
+                    rule_before_index,
+                    rule_after_index,
+                    "flexible")
+                if not is_all_flexible:
+                    continue
+                action_rule_decision = [
+                    decision_column.columns[0], [decision_before, decision_after]]
+                if counted_flexible >= self.min_flexible_antecedents and \
+                        counted_stable >= self.min_stable_antecedents and \
+                        counted_flexible <= self.max_flexible_antecedents and \
+                        counted_stable <= self.max_stable_antecedents:
+                    if not self.is_nan:
+                        support = min(supp[rule_before_index], supp[rule_after_index])
+                        confidence = conf[rule_before_index] * conf[rule_after_index]
+                        uplift = self._get_uplift(
+                            supp[rule_before_index],
+                            conf[rule_before_index],
+                            conf[rule_after_index]
+                        )
+                    else:
+                        total = len(self.decisions.data.index)
+                        if total == 0:
+                            support = None
+                            confidence = None
+                            uplift = None
                         else:
-                            total = len(self.decisions.transactions)
-                            if total == 0:
-                                support = None
-                                confidence = None
-                                uplift = None
+                            (left_support_before, support_before) = self._get_frequency_from_mask(
+                                action_rule_stable,
+                                action_rule_flexible,
+                                action_rule_decision,
+                                0
+                                )
+                            (left_support_after, support_after) = self._get_frequency_from_mask(action_rule_stable,
+                                                                                                action_rule_flexible,
+                                                                                                action_rule_decision,
+                                                                                                1
+                                                                                                )
+                            support = support_before / total
+                            if left_support_before != 0 and left_support_after != 0:
+                                confidence = (support_before / left_support_before) * (
+                                            support_after / left_support_after)
+                                uplift = self._get_uplift(
+                                    support_before,
+                                    (support_before / left_support_before),
+                                    (support_after / left_support_after)
+                                )
                             else:
-                                (left_support_before, support_before) = self._get_frequency_from_mask(
-                                    action_rule_stable,
-                                    action_rule_flexible,
-                                    action_rule_decision,
-                                    0
-                                    )
-                                (left_support_after, support_after) = self._get_frequency_from_mask(action_rule_stable,
-                                                                                                    action_rule_flexible,
-                                                                                                    action_rule_decision,
-                                                                                                    1
-                                                                                                    )
-                                support = support_before / total
-                                if left_support_before != 0 and left_support_after != 0:
-                                    confidence = (support_before / left_support_before) * (
-                                                support_after / left_support_after)
-                                    uplift = self._get_uplift(
-                                        support_before,
-                                        (support_before / left_support_before),
-                                        (support_after / left_support_after)
-                                    )
-                                else:
-                                    confidence = 0
-                                    uplift = 0
-                        action_rule_supp = [supp[rule_before_index],
-                                            supp[rule_after_index],
-                                            support
-                                            ]
-                        action_rule_conf = [conf[rule_before_index],
-                                            conf[rule_after_index],
-                                            confidence
-                                            ]
-                        self._add_action_rule(action_rule_stable,
-                                              action_rule_flexible,
-                                              action_rule_decision,
-                                              action_rule_supp,
-                                              action_rule_conf,
-                                              uplift,
-                                              util_dif,
-                                              profit)
-                        self.classification_before.append(rule_before_index)
-                        self.classification_after.append(rule_after_index)
+                                confidence = 0
+                                uplift = 0
+                    action_rule_supp = [supp[rule_before_index],
+                                        supp[rule_after_index],
+                                        support
+                                        ]
+                    action_rule_conf = [conf[rule_before_index],
+                                        conf[rule_after_index],
+                                        confidence
+                                        ]
+                    action_rule = self._join_action_rule(action_rule_stable,
+                                                         action_rule_flexible,
+                                                         action_rule_decision,
+                                                         action_rule_supp,
+                                                         action_rule_conf,
+                                                         uplift,
+                                                         util_dif,
+                                                         profit)
+                    yield action_rule, rule_before_index, rule_after_index
+
+    def _get_allowed_after_codes(self, decision_column: pd.DataFrame) -> tuple:
+        """Encode consequent and get the allowed after codes for every before code.
+
+        The result is computed again only if the table changes (reduction tables share one base table).
+
+        Parameters
+        ----------
+        decision_column : pd.DataFrame
+            Data frame with consequent.
+
+        Returns
+        -------
+        tuple
+            Codes of consequent and dictionary before code -> array of allowed after codes.
+        """
+        if self._decision_cache is None or self._decision_cache[0] is not decision_column:
+            decision_codes, uniques = pd.factorize(decision_column.iloc[:, 0], use_na_sentinel=False)
+            allowed_after_codes = {before_code: [] for before_code in range(len(uniques))}
+            for before_code, after_code in sorted(self.desired_state.get_allowed_code_pairs(list(uniques))):
+                allowed_after_codes[before_code].append(after_code)
+            allowed_after_codes = {before_code: np.array(after_codes, dtype=np.int64)
+                                   for before_code, after_codes in allowed_after_codes.items()}
+            self._decision_cache = (decision_column, decision_codes, allowed_after_codes)
+        return self._decision_cache[1], self._decision_cache[2]
+
+    @staticmethod
+    def _get_lower_codes(table: pd.DataFrame) -> np.ndarray:
+        """Encode values where case is ignored (the same comparison as in _is_action_couple).
+
+        Parameters
+        ----------
+        table : pd.DataFrame
+            Data frame with stable or flexible attributes.
+
+        Returns
+        -------
+        np.ndarray
+            Matrix of codes (rows x columns), NaN values have code -1.
+        """
+        codes = np.empty((len(table.index), len(table.columns)), dtype=np.int64)
+        for position, column in enumerate(table.columns):
+            value_codes, uniques = pd.factorize(table[column], use_na_sentinel=False)
+            lower_values = [str(value).lower() for value in uniques]
+            lower_codes, _ = pd.factorize(pd.Index(lower_values, dtype=object))
+            lower_codes[np.array([value == "nan" for value in lower_values], dtype=bool)] = -1
+            codes[:, position] = lower_codes[value_codes]
+        return codes
+
+    def _get_signatures(self, stable_columns: pd.DataFrame, flexible_columns: pd.DataFrame) -> tuple:
+        """Group rows by null pattern (which stable and flexible attributes are present).
+
+        The compatibility table says which before and after patterns can make an action rule:
+        a stable attribute present just on one side breaks the rule without uncertainty, a flexible attribute
+        present just on one side breaks the rule unless both uncertainty and strict flexible are used.
+        If the pair is not broken, the number of stable pairs is the number of stable attributes present
+        in the after rule (the same for flexible attributes with strict flexible, otherwise it is the upper bound),
+        so the antecedent limits are checked for whole patterns too.
+        The result is computed again only if the tables change.
+
+        Parameters
+        ----------
+        stable_columns : pd.DataFrame
+            Data frame with stable attributes.
+        flexible_columns : pd.DataFrame
+            Data frame with flexible attributes.
+
+        Returns
+        -------
+        tuple
+            Pattern of every row, boolean compatibility table (before pattern x after pattern)
+            and codes of flexible attributes.
+        """
+        if self._signature_cache is not None and self._signature_cache[0] is stable_columns and \
+                self._signature_cache[1] is flexible_columns:
+            return self._signature_cache[2:]
+        flexible_codes = self._get_lower_codes(flexible_columns)
+        stable_present = self._get_lower_codes(stable_columns) != -1
+        flexible_present = flexible_codes != -1
+        present = np.hstack((stable_present, flexible_present))
+        if present.shape[1] == 0:
+            patterns = np.zeros((1, 0), dtype=bool)
+            signatures = np.zeros(len(present), dtype=np.int64)
+        else:
+            patterns, signatures = np.unique(present, axis=0, return_inverse=True)
+            signatures = signatures.reshape(-1)
+        stable_patterns = patterns[:, :stable_present.shape[1]]
+        flexible_patterns = patterns[:, stable_present.shape[1]:]
+        stable_count = stable_patterns.sum(axis=1)
+        flexible_count = flexible_patterns.sum(axis=1)
+        compatible = np.ones((len(patterns), len(patterns)), dtype=bool)
+        if not self.is_nan:
+            compatible &= (stable_patterns[:, None, :] == stable_patterns[None, :, :]).all(axis=2)
+        if not (self.is_nan and self.is_strict_flexible):
+            compatible &= (flexible_patterns[:, None, :] == flexible_patterns[None, :, :]).all(axis=2)
+        compatible &= ((stable_count >= self.min_stable_antecedents) &
+                       (stable_count <= self.max_stable_antecedents))[None, :]
+        compatible &= (flexible_count >= self.min_flexible_antecedents)[None, :]
+        if self.is_strict_flexible:
+            compatible &= (flexible_count <= self.max_flexible_antecedents)[None, :]
+        self._signature_cache = (stable_columns, flexible_columns, signatures, compatible, flexible_codes)
+        return signatures, compatible, flexible_codes
+
+    @staticmethod
+    def _get_inverted_index(codes: np.ndarray) -> list:
+        """Get the inverted index from (column, value) to rows.
+
+        Parameters
+        ----------
+        codes : np.ndarray
+            Matrix of codes (rows x columns), NaN values have code -1.
+
+        Returns
+        -------
+        list
+            Dictionary code -> array of row positions for every column (NaN values are not indexed).
+        """
+        inverted_index = []
+        for column in range(codes.shape[1]):
+            order = np.argsort(codes[:, column], kind="stable")
+            unique_codes, starts = np.unique(codes[order, column], return_index=True)
+            ends = np.append(starts[1:], len(order))
+            inverted_index.append({code: order[start:end] for code, start, end in zip(unique_codes.tolist(),
+                                                                                       starts, ends) if code != -1})
+        return inverted_index
+
+    def _get_candidates(self,
+                        stable_columns: pd.DataFrame,
+                        flexible_columns: pd.DataFrame,
+                        decision_column: pd.DataFrame,
+                        before_indexes: np.ndarray,
+                        after_indexes: np.ndarray,
+                        pair_filter: tuple = None):
+        """It yields candidate pairs of classification rules bucketed by consequent.
+
+        Every before rule is paired just with the after rules whose consequent makes an allowed change
+        and whose null pattern is compatible, the pairs are in the same order as from itertools.product.
+        With strict flexible, the after rules sharing any flexible value with the before rule are excluded
+        by the inverted index.
+
+        Parameters
+        ----------
+        stable_columns : pd.DataFrame
+            Data frame with stable attributes.
+        flexible_columns : pd.DataFrame
+            Data frame with flexible attributes.
+        decision_column : pd.DataFrame
+            Data frame with consequent.
+        before_indexes : np.ndarray
+            Indexes that can be used in the before part.
+        after_indexes : np.ndarray
+            Indexes that can be used in the after part.
+        pair_filter : tuple = None
+            Groups of before indexes, groups of after indexes and boolean matrix of allowed (before, after) groups.
+
+        Yields
+        ------
+        tuple
+            Pair (rule_before_index, rule_after_index).
+        """
+        decision_codes, allowed_after_codes = self._get_allowed_after_codes(decision_column)
+        signatures, compatible, flexible_codes = self._get_signatures(stable_columns, flexible_columns)
+        before_rows = decision_column.index.get_indexer(before_indexes)
+        after_rows = decision_column.index.get_indexer(after_indexes)
+        if self.is_strict_flexible:
+            inverted_index = self._get_inverted_index(flexible_codes[after_rows])
+            shared = np.zeros(len(after_rows), dtype=bool)
+        before_codes = decision_codes[before_rows]
+        after_codes = decision_codes[after_rows]
+        before_signatures = signatures[before_rows]
+        after_signatures = signatures[after_rows]
+        buckets = {}
+        for before_position, rule_before_index in enumerate(before_indexes):
+            bucket = (before_codes[before_position], before_signatures[before_position])
+            if bucket not in buckets:
+                buckets[bucket] = np.flatnonzero(np.isin(after_codes, allowed_after_codes[bucket[0]]) &
+                                                 compatible[bucket[1], after_signatures])
+            after_positions = buckets[bucket]
+            if self.is_strict_flexible:
+                # the same flexible value on both sides breaks the rule
+                shared[:] = False
+                for column, code in enumerate(flexible_codes[before_rows[before_position]].tolist()):
+                    if code in inverted_index[column]:
+                        shared[inverted_index[column][code]] = True
+                after_positions = after_positions[~shared[after_positions]]
+            if pair_filter is not None:
+                before_groups, after_groups, new_pairs = pair_filter
+                after_positions = after_positions[new_pairs[before_groups[before_position],
+                                                            after_groups[after_positions]]]
+            for after_position in after_positions:
+                yield rule_before_index, after_indexes[after_position]
+
+    def _fit_table(self, pair_matching, *tables):
+        """It finds action rules in one reduction table and adds them to the lists.
+
+        Parameters
+        ----------
+        pair_matching : PairMatching or None
+            PairMatching for the numpy engine.
+        *tables :
+            Tables, supports, confidences, utilities, partition and new segment pairs (see _iter_table).
+        """
+        for action_rule, rule_before_index, rule_after_index in self._iter_table(pair_matching, *tables):
+            self.action_rules.append(action_rule)
+            self.classification_before.append(rule_before_index)
+            self.classification_after.append(rule_after_index)
+
+    def _iter_tables(self):
+        """It finds action rules in all reduction tables one by one in this process.
+
+        Yields
+        ------
+        tuple
+            Action rule, index of the before classification rule and index of the after classification rule.
+        """
+        pair_matching = self._get_pair_matching()
+        for tables in self._get_tables():
+            partition = tables[-1]
+            new_segment_pairs = None
+            if partition is not None and self.is_nan:
+                new_segment_pairs = self._get_new_segment_pairs(partition)
+            yield from self._iter_table(pair_matching, *tables, new_segment_pairs)
+
+    @staticmethod
+    def get_rank_value(action_rule: list, rank_by: str) -> float:
+        """Get the value of an action rule used for ranking.
+
+        Parameters
+        ----------
+        action_rule : list
+            Action rule with its supports, confidences, uplift, utility difference and profit.
+        rank_by : str
+            Name of the value (see RANK_BY).
+
+        Returns
+        -------
+        float
+            Value of rank_by, missing value is -inf.
+        """
+        if rank_by == "support":
+            value = action_rule[1][2]
+        elif rank_by == "confidence":
+            value = action_rule[2][2]
+        elif rank_by == "uplift":
+            value = action_rule[3]
+        elif rank_by == "util_dif":
+            value = action_rule[4]
+        else:
+            value = action_rule[5]
+        if value is None or math.isnan(value):
+            return -math.inf
+        return value
+
+    def _get_rank_bound(self,
+                        supp: pd.Series,
+                        conf: pd.Series,
+                        rule_before_index: int,
+                        rule_after_index: int,
+                        util_dif: float,
+                        profit: float) -> float:
+        """Get the upper bound of the ranked value of an action rule made from two classification rules.
+
+        It is computed before the action rule is created. Without uncertainty the values are computed
+        from classification rules, so the bound is exact. With uncertainty support, confidence and uplift
+        are counted from the data, so only their ranges are known.
+
+        Parameters
+        ----------
+        supp : pd.Series
+            Supports of classification rules.
+        conf : pd.Series
+            Confidences of classification rules.
+        rule_before_index : int
+            Candidate before index.
+        rule_after_index : int
+            Candidate after index.
+        util_dif : float
+            Utility difference.
+        profit : float
+            Profit.
+
+        Returns
+        -------
+        float
+            Upper bound of the ranked value, inf if it is not known.
+        """
+        if self.rank_by in ("util_dif", "profit"):
+            value = util_dif if self.rank_by == "util_dif" else profit
+            if value is None:
+                # without a utility table there is no value to bound, no pair is pruned
+                return math.inf
+            return value
+        if self.is_nan:
+            if self.rank_by == "uplift":
+                # uplift is at most the support before (number of rows)
+                return float(len(self.decisions.data.index))
+            return 1.0
+        if self.rank_by == "support":
+            return min(supp[rule_before_index], supp[rule_after_index])
+        if self.rank_by == "confidence":
+            return conf[rule_before_index] * conf[rule_after_index]
+        uplift = self._get_uplift(supp[rule_before_index], conf[rule_before_index], conf[rule_after_index])
+        if uplift is None:
+            return -math.inf
+        return uplift
+
+    def _push_ranked(self, heap: list, order: int, ranked_rule: tuple):
+        """Add an action rule to the heap of the top k action rules.
+
+        The heap keeps the k best action rules, from the same values the earlier found one is better.
+        When the heap is full, its minimal value is the threshold for the pruning of pairs.
+
+        Parameters
+        ----------
+        heap : list
+            Heap of (value, -order, ranked rule).
+        order : int
+            Order in which the action rule was found.
+        ranked_rule : tuple
+            Tuple where the third item from the end is the action rule.
+        """
+        item = (self.get_rank_value(ranked_rule[-3], self.rank_by), -order, ranked_rule)
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+        if len(heap) == self.top_k:
+            self._rank_threshold = heap[0][0]
+
+    def _set_ranked(self, heap: list):
+        """Set the action rules from the heap sorted by the ranked value.
+
+        Parameters
+        ----------
+        heap : list
+            Heap of (value, -order, (action rule, before index, after index)).
+        """
+        for _, _, (action_rule, rule_before_index, rule_after_index) in sorted(heap, key=lambda item: item[:2],
+                                                                                 reverse=True):
+            self.action_rules.append(action_rule)
+            self.classification_before.append(rule_before_index)
+            self.classification_after.append(rule_after_index)
+
+    def _get_pair_matching(self):
+        """Get PairMatching for the numpy engine.
+
+        Returns
+        -------
+        PairMatching or None
+            PairMatching object, None for the python engine.
+        """
+        if self.engine != "numpy":
+            return None
+        pair_matching = PairMatching(self.desired_state,
+                                     self.is_nan,
+                                     self.is_strict_flexible,
+                                     self.min_stable_antecedents,
+                                     self.min_flexible_antecedents,
+                                     self.max_stable_antecedents,
+                                     self.max_flexible_antecedents,
+                                     encoding=self.decisions.encoding)
+        if self.decision_tables and self.partitions is None:
+            pair_matching.set_pair_keys(pd.concat(self.decision_tables).index)
+        return pair_matching
+
+    def _get_jobs_count(self) -> int:
+        """Get the number of processes.
+
+        Returns
+        -------
+        int
+            Number of processes, -1 means all cores.
+        """
+        if self.n_jobs == -1:
+            return os.cpu_count() or 1
+        return self.n_jobs
+
+    def _estimate_pairs(self, partitions: list) -> list:
+        """Estimate the number of candidate pairs in every partition (before rules x after rules).
+
+        Parameters
+        ----------
+        partitions : list
+            Reduction tables as lists of positions in segments.
+
+        Returns
+        -------
+        list
+            Estimated number of pairs for every partition.
+        """
+        decision_column = self.decision_tables[0]
+        target = decision_column.columns[0]
+        before_mask = (~decision_column[target].isin(self.not_default_target_classes)).to_numpy()
+        after_mask = decision_column[target].isin(self.desired_target_classes).to_numpy()
+        before_counts = [np.count_nonzero(before_mask[segment]) for segment in self.segments]
+        after_counts = [np.count_nonzero(after_mask[segment]) for segment in self.segments]
+        return [sum(before_counts[segment_id] for segment_id in partition) *
+                sum(after_counts[segment_id] for segment_id in partition) for partition in partitions]
+
+    @staticmethod
+    def _balance_jobs(jobs: list, costs: list, jobs_count: int) -> list:
+        """Divide jobs to chunks with similar cost (the most expensive job goes to the cheapest chunk).
+
+        Parameters
+        ----------
+        jobs : list
+            Jobs.
+        costs : list
+            Cost of every job.
+        jobs_count : int
+            Number of chunks.
+
+        Returns
+        -------
+        list
+            Non-empty chunks of jobs, the jobs in a chunk keep their order.
+        """
+        chunks = [[] for _ in range(jobs_count)]
+        chunk_costs = [0] * jobs_count
+        for position in sorted(range(len(jobs)), key=lambda job: -costs[job]):
+            chunk = chunk_costs.index(min(chunk_costs))
+            chunks[chunk].append(position)
+            chunk_costs[chunk] += costs[position]
+        return [[jobs[position] for position in sorted(chunk)] for chunk in chunks if chunk]
+
+    def _fit_partitions(self, jobs: list) -> list:
+        """Find action rules in a chunk of partitions (it runs in a worker process).
+
+        Parameters
+        ----------
+        jobs : list
+            List of (position, partition, new segment pairs).
+
+        Returns
+        -------
+        list
+            List of (position, action rules, classification before, classification after).
+        """
+        pair_matching = self._get_pair_matching()
+        base_tables = self._get_base_tables()
+        results = []
+        heap = []
+        order = 0
+        # A worker runs more chunks, the threshold of the previous chunk would prune rules tied with it
+        self._rank_threshold = None
+        for position, partition, new_segment_pairs in jobs:
+            if self.top_k is None:
+                self.action_rules = []
+                self.classification_before = []
+                self.classification_after = []
+                self._fit_table(pair_matching, *base_tables, partition, new_segment_pairs)
+                results.append((position, self.action_rules, self.classification_before,
+                                self.classification_after))
+                continue
+            # the top k action rules of the chunk contain all action rules of the chunk from the global top k
+            for action_rule, rule_before_index, rule_after_index in self._iter_table(
+                    pair_matching, *base_tables, partition, new_segment_pairs):
+                self._push_ranked(heap, order, (position, action_rule, rule_before_index, rule_after_index))
+                order += 1
+        for item in sorted(heap, key=lambda ranked: -ranked[1]):
+            position, action_rule, rule_before_index, rule_after_index = item[2]
+            results.append((position, [action_rule], [rule_before_index], [rule_after_index]))
+        return results
+
+    def _fit_parallel(self):
+        """Find action rules in the partitions with a pool of processes.
+
+        The partitions are divided by the estimated number of pairs. The results are merged
+        in the order of partitions, so they are the same as from one process.
+        """
+        partitions = self.partitions
+        self.partitions = collections.deque()
+        jobs = []
+        for position, partition in enumerate(partitions):
+            new_segment_pairs = None
+            if self.is_nan:
+                new_segment_pairs = self._get_new_segment_pairs(partition)
+            jobs.append((position, partition, new_segment_pairs))
+        jobs_count = min(self._get_jobs_count(), len(jobs))
+        chunks = self._balance_jobs(jobs, self._estimate_pairs(partitions), jobs_count)
+        results = []
+        with ProcessPoolExecutor(max_workers=jobs_count, initializer=_init_worker, initargs=(self,)) as executor:
+            for chunk_results in executor.map(_fit_partitions, chunks):
+                results.extend(chunk_results)
+        heap = []
+        order = 0
+        for position, action_rules, classification_before, classification_after in sorted(results,
+                                                                                           key=lambda r: r[0]):
+            if self.top_k is not None:
+                for ranked_rule in zip(action_rules, classification_before, classification_after):
+                    self._push_ranked(heap, order, ranked_rule)
+                    order += 1
+                continue
+            self.action_rules.extend(action_rules)
+            self.classification_before.extend(classification_before)
+            self.classification_after.extend(classification_after)
+        if self.top_k is not None:
+            self._set_ranked(heap)
+
+    def fit(self):
+        """It finds all pairs of classification rules and tries to create action rules.
+
+        """
+        if self.partitions is not None and len(self.partitions) > 1 and self._get_jobs_count() > 1:
+            self._fit_parallel()
+        elif self.top_k is not None:
+            heap = []
+            for order, ranked_rule in enumerate(self._iter_tables()):
+                self._push_ranked(heap, order, ranked_rule)
+            self._set_ranked(heap)
+        else:
+            for action_rule, rule_before_index, rule_after_index in self._iter_tables():
+                self.action_rules.append(action_rule)
+                self.classification_before.append(rule_before_index)
+                self.classification_after.append(rule_after_index)
 
         # sort by utility difference
         if self.util_flex is not None and self.util_target is not None and self.sort_by_util_dif:
             self.action_rules.sort(key=lambda rule: rule[4], reverse=True)
 
+    def iter_fit(self, is_stored: bool = True):
+        """It finds action rules like fit, but yields them as soon as they are found.
+
+        The found action rules are stored too (like from fit), so the ones yielded so far are in action_rules.
+        The reduction tables are processed in this process (n_jobs is not used) and sorting by utility
+        difference is not possible. If the generator is closed early, the rest of the tables is not searched.
+
+        Parameters
+        ----------
+        is_stored : bool = True
+            Should the found action rules be stored? If not, action_rules and classification rules
+            of action rules stay empty.
+            DEFAULT: True
+
+        Yields
+        ------
+        list
+            Action rule with its supports, confidences, uplift, utility difference and profit.
+        """
+        if self.util_flex is not None and self.util_target is not None and self.sort_by_util_dif:
+            raise Exception("Sorting by utility difference needs all action rules, use fit")
+        if self.top_k is not None:
+            raise Exception("Top k action rules need all action rules, use fit")
+        for action_rule, rule_before_index, rule_after_index in self._iter_tables():
+            if is_stored:
+                self.action_rules.append(action_rule)
+                self.classification_before.append(rule_before_index)
+                self.classification_after.append(rule_after_index)
+            yield action_rule
+
     def pretty_text(self):
         """It generates human language representation of action rules.
 
@@ -567,7 +1340,7 @@ class ActionRules:
         tuple
             An action rule's left support and support (with target)
         """
-        new_data = self.decisions.data.map(str).copy()
+        bitmap_index = self.decisions.bitmap_index
         columns_values = []
 
         for condition in action_rule_stable:
@@ -581,20 +1354,39 @@ class ActionRules:
             value = condition[1][part]
             columns_values.append([column, value])
 
-        for column_value in columns_values:
-            col = column_value[0]
-            val = column_value[1]
-            if val is not None:
-                mask = new_data[col] == val
-                new_data = new_data[mask]
+        conditions = [(column_value[0], column_value[1]) for column_value in columns_values
+                      if column_value[1] is not None]
+        decision = (action_rule_decision[0], action_rule_decision[1][part])
+
+        return bitmap_index.get_frequency(conditions, decision)
+
 
-        left_support = len(new_data)
+_worker_action_rules = None
 
-        col = action_rule_decision[0]
-        val = action_rule_decision[1][part]
-        mask = new_data[col] == val
-        new_data = new_data[mask]
 
-        support = len(new_data)
+def _init_worker(action_rules: ActionRules):
+    """Keep ActionRules in a worker process.
+
+    Parameters
+    ----------
+    action_rules : ActionRules
+        ActionRules object with the base tables and segments.
+    """
+    global _worker_action_rules
+    _worker_action_rules = action_rules
 
-        return left_support, support
+
+def _fit_partitions(jobs: list) -> list:
+    """Find action rules in a chunk of partitions in a worker process.
+
+    Parameters
+    ----------
+    jobs : list
+        List of (position, partition, new segment pairs).
+
+    Returns
+    -------
+    list
+        List of (position, action rules, classification before, classification after).
+    """
+    return _worker_action_rules._fit_partitions(jobs)
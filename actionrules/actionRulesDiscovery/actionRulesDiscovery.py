@@ -1,8 +1,12 @@
-from typing import List
+from typing import List, Iterable
+import itertools
 import pandas as pd
+import numpy as np
 
 from actionrules.desiredState import DesiredState
 from actionrules.decisions import Decisions
+from actionrules.ruleIndex import RuleIndex
+from actionrules.modelFile import ModelFile
 from actionrules.reduction import Reduction
 from actionrules.actionRules import ActionRules
 from actionrules.utilityMining import UtilityMining
@@ -30,6 +34,8 @@ class ActionRulesDiscovery:
         List of flexible attributes.
     consequent: str
         Name of consequent columns.
+    is_lazy: bool
+        True if the search of action rules is not finished yet (they are generated by iter_action_rules).
 
     Methods
     -------
@@ -53,7 +59,14 @@ class ActionRulesDiscovery:
         max_flexible_attributes: int = 5,
         min_util_dif: float = None,
         utility source = None,
-        sort_by_util_dif: bool = False
+        sort_by_util_dif: bool = False,
+        engine: str = "python",
+        n_jobs: int = 1,
+        is_lazy: bool = False,
+        top_k: int = None,
+        rank_by: str = "uplift",
+        rule_mining_mode: str = "all",
+        miner = "auto"
         )
         Train the model from transaction data.
     fit_classification_rules(self,
@@ -72,9 +85,16 @@ class ActionRulesDiscovery:
                              max_flexible_attributes: int = 5,
                              min_util_dif: float = None,
                              utility source = None,
-                             sort_by_util_dif: bool = False
+                             sort_by_util_dif: bool = False,
+                             engine: str = "python",
+                             n_jobs: int = 1,
+                             is_lazy: bool = False,
+                             top_k: int = None,
+                             rank_by: str = "uplift"
                              )
         Train the model from classification rules.
+    iter_action_rules(self, limit: int = None, is_stored: bool = True)
+        Yield action rules as soon as they are found.
     get_action_rules(self) -> list
         Get list of action rules (machine representation)
     get_pretty_action_rules(self) -> list
@@ -83,8 +103,24 @@ class ActionRulesDiscovery:
         Get math representation of action rules
     get_source_data_for_ar(self, action_r_number: int, is_before: bool) -> pd.DataFrame
         Get the source data the action rule is discovered from.
-    predict(self, source_table: pd.DataFrame) -> pd.DataFrame
+    get_action_rules_table(self) -> pd.DataFrame
+        Get recommendations and metrics of action rules in a data frame.
+    predict(self, source_table: pd.DataFrame, is_compact: bool = False, top_k_per_row: int = None,
+            rank_by: str = "uplift") -> pd.DataFrame
         Predicts if new occurrence would need any change.
+    predict_chunks(self, chunks: Iterable[pd.DataFrame], is_compact: bool = False, top_k_per_row: int = None,
+                   rank_by: str = "uplift")
+        Predict chunk by chunk.
+    predict_csv(self, file: str, output_file: str = None, chunksize: int = 100000, is_compact: bool = False,
+                top_k_per_row: int = None, rank_by: str = "uplift", **kwargs)
+        Predict a CSV file chunk by chunk.
+    predict_parquet(self, file: str, output_file: str = None, batch_size: int = 100000, columns: List[str] = None,
+                    is_compact: bool = False, top_k_per_row: int = None, rank_by: str = "uplift")
+        Predict a Parquet file chunk by chunk.
+    save(self, file: str, is_data: bool = False)
+        Save the fitted model to a file.
+    load(self, file: str)
+        Load a model saved by save.
 
     """
     ACTION_RULE = "action rule"
@@ -97,6 +133,15 @@ class ActionRulesDiscovery:
     ACTION_RULE_CONFIDENCE = "action rule confidence"
     ACTION_RULE_UPLIFT = "uplift"
     RECOMMENDED = "-recommended"
+    ROW = "row"
+    PREDICT_METRICS = [ACTION_RULE_TARGET,
+                       SUPPORT_BEFORE,
+                       SUPPORT_AFTER,
+                       ACTION_RULE_SUPPORT,
+                       CONFIDENCE_BEFORE,
+                       CONFIDENCE_AFTER,
+                       ACTION_RULE_CONFIDENCE,
+                       ACTION_RULE_UPLIFT]
 
     def __init__(self):
         """
@@ -108,6 +153,10 @@ class ActionRulesDiscovery:
         self.stable_attributes = []
         self.flexible_attributes = []
         self.consequent = ""
+        self.is_lazy = False
+        self._lazy_action_rules = None
+        self._is_stored = True
+        self._rule_index = None
 
     def _check_columns(self, attributes: List[str], consequent: str):
         """Checks if inserted data is valid (columns exist, rows exist).
@@ -157,6 +206,24 @@ class ActionRulesDiscovery:
         """
         self.decisions.load_pandas(data_frame)
 
+    @staticmethod
+    def _as_list(series: pd.Series) -> list:
+        """Wrap a Pandas Series to list (None stays None).
+
+        Parameters
+        ----------
+        series : pd.Series
+            Pandas Series or None.
+
+        Returns
+        -------
+        list
+            List with the Series or None.
+        """
+        if series is None:
+            return None
+        return [series]
+
     def _is_binary_target(self, target):
         return target.nunique()[0] == 2
 
@@ -179,7 +246,14 @@ class ActionRulesDiscovery:
             min_util_dif: float = None,
             min_profit: float = None,
             utility_source = None,
-            sort_by_util_dif: bool = False
+            sort_by_util_dif: bool = False,
+            engine: str = "python",
+            n_jobs: int = 1,
+            is_lazy: bool = False,
+            top_k: int = None,
+            rank_by: str = "uplift",
+            rule_mining_mode: str = "all",
+            miner = "auto"
             ):
         """Train the model from transaction data.
 
@@ -210,6 +284,19 @@ class ActionRulesDiscovery:
         - utility_source
         Should the output rules be sorted by difference in utility?
         - sort_by_util_dif
+        Engine used for pairing of classification rules.
+        - engine
+        Number of processes used for reduction tables.
+        - n_jobs
+        Should the search wait for iter_action_rules?
+        - is_lazy
+        Should just the best action rules be kept?
+        - top_k
+        - rank_by
+        Which classification rules are mined?
+        - rule_mining_mode
+        Algorithm used for mining of classification rules.
+        - miner
 
         Parameters
         ----------
@@ -266,6 +353,36 @@ class ActionRulesDiscovery:
         sort_by_util_dif : bool = False
             Are the output action rules sorted by utility difference?
             DEFAULT: FALSE
+        engine : str = "python"
+            Engine used for pairing of classification rules - "python" (pair by pair)
+            or "numpy" (vectorized, the same output).
+            DEFAULT: "python"
+        n_jobs : int = 1
+            Number of processes, the reduction tables are divided among them by the estimated
+            number of pairs. -1 means all cores. The output is the same as from one process.
+            DEFAULT: 1
+        is_lazy : bool = False
+            If true, the action rules are not searched now, they are generated by iter_action_rules.
+            The other methods finish the search when they need the action rules.
+            DEFAULT: FALSE
+        top_k : int = None
+            Number of the best action rules that are kept (sorted from the best). The pairs of classification
+            rules that cannot get to the top k are skipped. None means all action rules.
+            DEFAULT: None
+        rank_by : str = "uplift"
+            Value used for top_k - "uplift", "confidence", "support", "util_dif" (needs min_util_dif)
+            or "profit" (needs min_profit).
+            DEFAULT: "uplift"
+        rule_mining_mode : str = "all"
+            Which classification rules are mined - "all", "closed", "maximal" or "generators".
+            Except "all", just the rules made of a closed or maximal frequent item set or a generator are kept,
+            so the decision table is smaller and fewer pairs are evaluated.
+            DEFAULT: "all"
+        miner = "auto"
+            Algorithm used for mining of classification rules - "apriori", "fpgrowth", "eclat" (PyFIM),
+            "numpy" (NumpyMiner on encoded columns, without transactions) or "auto" (FP-growth for dense data,
+            Eclat for sparse data). It can be also a function with the interface of PyFIM.
+            DEFAULT: "auto"
         """
         if (self.action_rules):
             raise Exception("Fit was already called")
@@ -279,9 +396,32 @@ class ActionRulesDiscovery:
 
         attributes = stable_attributes + flexible_attributes
         self._check_columns(attributes, consequent)
-        self.decisions.prepare_data_fim(attributes, consequent)
-        self.decisions.fit_fim_apriori(conf=conf, support=supp)
+        # Just the consequent classes that can make a desired change are mined
+        consequent_values = self.desired_state.get_used_classes()
+        if is_nan:
+            self.decisions.prepare_data_fim(attributes, consequent, consequent_values=consequent_values)
+            self.decisions.fit_fim_apriori(conf=conf, support=supp, rule_mining_mode=rule_mining_mode,
+                                           miner=miner)
+        else:
+            # Without uncertainty both rules of a pair have the same stable (and strict flexible) attributes,
+            # so the antecedent limits hold for every classification rule
+            max_flexible_length = max_flexible_attributes if is_strict_flexible else len(flexible_attributes)
+            self.decisions.prepare_data_fim(attributes,
+                                            consequent,
+                                            min_stable_attributes + min_flexible_attributes + 1,
+                                            max_stable_attributes + max_flexible_length + 1,
+                                            consequent_values)
+            self.decisions.fit_fim_apriori(conf=conf, support=supp, rule_mining_mode=rule_mining_mode,
+                                           miner=miner)
+            self.decisions.filter_rules(stable_attributes, min_stable_attributes, max_stable_attributes)
+            self.decisions.filter_rules(flexible_attributes,
+                                        min_flexible_attributes,
+                                        max_flexible_attributes if is_strict_flexible else None)
         self.decisions.generate_decision_table()
+        if consequent not in self.decisions.decision_table.columns:
+            # No classification rules were mined (e.g. no desired class is in data), no action rules are found
+            self.decisions.decision_table[consequent] = pd.Categorical(
+                [], categories=self.decisions.encoding.categories[consequent])
         # Not all columns are in the generated classification rules
         self.stable_attributes = list(set(stable_attributes).intersection(set(self.decisions.decision_table.columns)))
         self.flexible_attributes = list(set(flexible_attributes).intersection(set(self.decisions.decision_table.columns)))
@@ -307,26 +447,36 @@ class ActionRulesDiscovery:
         if is_reduction:
             reduced_tables.reduce()
         self.action_rules = ActionRules(
-            reduced_tables.stable_tables,
-            reduced_tables.flexible_tables,
-            reduced_tables.decision_tables,
+            [reduced_tables.stable_columns],
+            [reduced_tables.flexible_columns],
+            [reduced_tables.decision_column],
             self.desired_state,
             self.decisions,
-            reduced_tables.supp,
-            reduced_tables.conf,
+            [reduced_tables.supp],
+            [reduced_tables.conf],
             is_nan,
             min_stable_attributes,
             min_flexible_attributes,
             max_stable_attributes,
             max_flexible_attributes,
             is_strict_flexible,
-            reduced_tables.util_flex,
-            reduced_tables.util_target,
+            self._as_list(reduced_tables.util_flex),
+            self._as_list(reduced_tables.util_target),
             min_util_dif,
             min_profit,
-            sort_by_util_dif
+            sort_by_util_dif,
+            engine,
+            reduced_tables.partitions,
+            reduced_tables.segments,
+            n_jobs,
+            top_k,
+            rank_by
         )
-        self.action_rules.fit()
+        self.is_lazy = is_lazy
+        self._lazy_action_rules = None
+        self._is_stored = True
+        if not is_lazy:
+            self.action_rules.fit()
 
     def fit_classification_rules(self,
                                  stable_attributes: List[str],
@@ -347,7 +497,12 @@ class ActionRulesDiscovery:
                                  min_util_dif: float = None,
                                  min_profit: float = None,
                                  utility_source=None,
-                                 sort_by_util_dif: bool = False
+                                 sort_by_util_dif: bool = False,
+                                 engine: str = "python",
+                                 n_jobs: int = 1,
+                                 is_lazy: bool = False,
+                                 top_k: int = None,
+                                 rank_by: str = "uplift"
                                  ):
         """Train the model from classification rules.
 
@@ -378,6 +533,15 @@ class ActionRulesDiscovery:
         - utility_source
         Should the output rules be sorted by difference in utility?
         - sort_by_util_dif
+        Engine used for pairing of classification rules.
+        - engine
+        Number of processes used for reduction tables.
+        - n_jobs
+        Should the search wait for iter_action_rules?
+        - is_lazy
+        Should just the best action rules be kept?
+        - top_k
+        - rank_by
 
         Parameters
         ----------
@@ -430,6 +594,26 @@ class ActionRulesDiscovery:
         sort_by_util_dif : bool = False
             Are the output action rules sorted by utility difference?
             DEFAULT: FALSE
+        engine : str = "python"
+            Engine used for pairing of classification rules - "python" (pair by pair)
+            or "numpy" (vectorized, the same output).
+            DEFAULT: "python"
+        n_jobs : int = 1
+            Number of processes, the reduction tables are divided among them by the estimated
+            number of pairs. -1 means all cores. The output is the same as from one process.
+            DEFAULT: 1
+        is_lazy : bool = False
+            If true, the action rules are not searched now, they are generated by iter_action_rules.
+            The other methods finish the search when they need the action rules.
+            DEFAULT: FALSE
+        top_k : int = None
+            Number of the best action rules that are kept (sorted from the best). The pairs of classification
+            rules that cannot get to the top k are skipped. None means all action rules.
+            DEFAULT: None
+        rank_by : str = "uplift"
+            Value used for top_k - "uplift", "confidence", "support", "util_dif" (needs min_util_dif)
+            or "profit" (needs min_profit).
+            DEFAULT: "uplift"
         """
         if (self.action_rules):
             raise Exception("Fit was already called")
@@ -470,24 +654,114 @@ class ActionRulesDiscovery:
         if is_reduction:
             reduced_tables.reduce()
         self.action_rules = ActionRules(
-            reduced_tables.stable_tables,
-            reduced_tables.flexible_tables,
-            reduced_tables.decision_tables,
+            [reduced_tables.stable_columns],
+            [reduced_tables.flexible_columns],
+            [reduced_tables.decision_column],
             self.desired_state,
             self.decisions,
-            reduced_tables.supp,
-            reduced_tables.conf,
+            [reduced_tables.supp],
+            [reduced_tables.conf],
             is_nan,
             min_stable_attributes,
             min_flexible_attributes,
             max_stable_attributes,
             max_flexible_attributes,
             is_strict_flexible,
+            self._as_list(reduced_tables.util_flex),
+            self._as_list(reduced_tables.util_target),
             min_util_dif,
             min_profit,
-            sort_by_util_dif
+            sort_by_util_dif,
+            engine,
+            reduced_tables.partitions,
+            reduced_tables.segments,
+            n_jobs,
+            top_k,
+            rank_by
         )
-        self.action_rules.fit()
+        self.is_lazy = is_lazy
+        self._lazy_action_rules = None
+        self._is_stored = True
+        if not is_lazy:
+            self.action_rules.fit()
+
+    def iter_action_rules(self, limit: int = None, is_stored: bool = True):
+        """Yield action rules as soon as they are found.
+
+        If the model was trained with is_lazy, the action rules are searched now. The found action rules
+        are stored, so the next call yields them again and continues the search where the previous one
+        stopped (limit). Methods like get_action_rules or predict finish the search first, so they always
+        use all action rules. Otherwise the already found action rules are yielded.
+        The action rules have the same form as in get_action_rules.
+
+        Without storing (is_stored=False) the memory does not grow with the number of action rules, but
+        the search of a lazy model can be iterated just once and the methods that need all action rules
+        (get_action_rules, predict, save, ...) raise an exception until the model is fitted again.
+
+        Parameters
+        ----------
+        limit : int = None
+            Maximal number of action rules, the search stops when it is reached.
+            DEFAULT: None
+        is_stored : bool = True
+            Should the found action rules be stored? False needs a lazy model whose search was not started.
+            DEFAULT: True
+
+        Yields
+        ------
+        list
+            Action rule.
+        """
+        if not self.action_rules:
+            raise Exception("Fit must be called first")
+        if not self._is_stored:
+            raise Exception("The action rules were not stored, fit must be called again")
+        if is_stored:
+            yield from itertools.islice(self._iter_all_action_rules(), limit)
+            return
+        if not self.is_lazy or self._lazy_action_rules is not None:
+            raise Exception("Action rules can be iterated without storing only by a lazy model before its search")
+        self._is_stored = False
+        yield from itertools.islice(self.action_rules.iter_fit(is_stored=False), limit)
+
+    def _iter_all_action_rules(self):
+        """Yield the found action rules and then continue the lazy search.
+
+        Yields
+        ------
+        list
+            Action rule.
+        """
+        position = 0
+        while True:
+            while position < len(self.action_rules.action_rules):
+                yield self.action_rules.action_rules[position]
+                position += 1
+            if not self.is_lazy:
+                return
+            if self._lazy_action_rules is None:
+                self._lazy_action_rules = self.action_rules.iter_fit()
+            # The found action rule is stored by iter_fit
+            if next(self._lazy_action_rules, None) is None:
+                self.is_lazy = False
+                self._lazy_action_rules = None
+
+    def _finish_lazy_search(self):
+        """Find the rest of action rules of a lazy model.
+
+        If iter_action_rules was not called yet, the action rules are found by fit (n_jobs, top_k and
+        sorting can be used).
+        """
+        if not self.action_rules or not self.is_lazy:
+            return
+        if not self._is_stored:
+            raise Exception("The action rules were not stored, fit must be called again")
+        if self._lazy_action_rules is None:
+            self.is_lazy = False
+            self.action_rules.fit()
+            return
+        for _ in self._iter_all_action_rules():
+            pass
 
     def get_action_rules(self) -> list:
         """Get machine representations of action rules.
@@ -502,6 +776,7 @@ class ActionRulesDiscovery:
         list
             Returns list of action rules.
         """
+        self._finish_lazy_search()
         return self.action_rules.action_rules
 
     def get_pretty_action_rules(self) -> list:
@@ -512,6 +787,7 @@ class ActionRulesDiscovery:
         list
             Returns list of action rules.
         """
+        self._finish_lazy_search()
         if len(self.action_rules.action_rules_pretty_text) == 0:
             self.action_rules.pretty_text()
         return self.action_rules.action_rules_pretty_text
@@ -524,6 +800,7 @@ class ActionRulesDiscovery:
         list
             Returns list of action rules.
         """
+        self._finish_lazy_search()
         if len(self.action_rules.action_rules_representation) == 0:
             self.action_rules.representation()
         return self.action_rules.action_rules_representation
@@ -549,15 +826,16 @@ class ActionRulesDiscovery:
         pd.DataFrame
             Returns data frame with transactions data.
         """
-        if len(self.decisions.transactions) == 0:
+        if len(self.decisions.data.index) == 0 or len(self.decisions.decision_table.index) == 0:
             return pd.DataFrame()
+        self._finish_lazy_search()
         if is_before:
             classification = self.action_rules.classification_before[action_r_number]
         else:
             classification = self.action_rules.classification_after[action_r_number]
         decision = self.decisions.decision_table.loc[
             classification, self.stable_attributes + self.flexible_attributes]
-        source_table = self._reduce_table_source(decision, self.decisions.data)
+        source_table = self._reduce_table_source(decision, self.decisions.data.map(str))
         return source_table.style.map(lambda x: 'background-color: yellow',
                                            subset=self.stable_attributes) \
             .map(lambda x: 'background-color: orange',
@@ -565,8 +843,10 @@ class ActionRulesDiscovery:
             .map(lambda x: 'color: green' if x in self.desired_state.get_destination_classes() else 'color: red',
                       subset=[self.consequent])
 
-    @staticmethod
-    def _reduce_table_source(decision: pd.Series, source_table: pd.DataFrame) -> pd.DataFrame:
+    def _reduce_table_source(self,
+                             decision: pd.Series,
+                             source_table: pd.DataFrame,
+                             source_codes: dict = None) -> pd.DataFrame:
         """ Get data frame limited by concrete classification rule.
 
         Parameters
@@ -574,78 +854,447 @@ class ActionRulesDiscovery:
         decision : pd.Series
             A classification rule.
         source_table : pd.DataFrame
-            A source data frame.
+            A source data frame with values converted to strings.
+        source_codes : dict = None
+            Already encoded columns of the source data frame (see Encoding), it is filled when needed.
 
         Returns
         -------
         pd.DataFrame
             Returns a limited data frame.
         """
-        new_data = source_table.map(str).copy()
+        if source_codes is None:
+            source_codes = {}
+        encoding = self.decisions.encoding
+        mask = np.ones(len(source_table.index), dtype=bool)
         for key, value in decision.items():
             if str(value).lower() != "nan":
-                mask = new_data[key] == value
-                new_data = new_data[mask]
-        return new_data
+                if key not in source_codes:
+                    source_codes[key] = encoding.get_codes(key, source_table[key])
+                mask &= source_codes[key] == encoding.get_code(key, value)
+        return source_table[mask].copy()
+
+    def _get_rule_index(self) -> RuleIndex:
+        """Get the compiled index of the before parts of action rules.
 
-    def predict(self, source_table: pd.DataFrame) -> pd.DataFrame:
+        The index is built again only if the number of action rules changes (lazy search).
+
+        Returns
+        -------
+        RuleIndex
+            Index of action rules.
+        """
+        if self._rule_index is None or self._rule_index.rules_count != len(self.action_rules.action_rules):
+            rules_count = len(self.action_rules.action_rules)
+            conditions = self.decisions.decision_table.loc[
+                self.action_rules.classification_before[:rules_count],
+                self.stable_attributes + self.flexible_attributes]
+            self._rule_index = RuleIndex(conditions, self.decisions.encoding)
+        return self._rule_index
+
+    def _get_recommended_values(self) -> dict:
+        """Get recommended values of flexible attributes for all action rules.
+
+        Returns
+        -------
+        dict
+            Column name -> values (NaN if the action rule has no recommendation for the attribute).
+        """
+        rules_count = len(self.action_rules.action_rules)
+        decisions_after = self.decisions.decision_table.loc[
+            self.action_rules.classification_after[:rules_count], self.flexible_attributes]
+        recommended_values = {}
+        for column in self.flexible_attributes:
+            values = decisions_after[column].astype(object).to_numpy()
+            is_value = np.array([str(value).lower() != "nan" for value in values], dtype=bool)
+            recommended_values[column + self.RECOMMENDED] = np.where(is_value, values, np.nan)
+        return recommended_values
+
+    def get_action_rules_table(self) -> pd.DataFrame:
+        """Get recommendations and metrics of action rules, one row for every action rule.
+
+        It can be joined to the compact output of predict on the column "action rule".
+
+        Returns
+        -------
+        pd.DataFrame
+            Data frame indexed by the number of action rule.
+        """
+        self._finish_lazy_search()
+        action_rules = self.action_rules.action_rules
+        table = pd.DataFrame({column: values for column, values in self._get_recommended_values().items()
+                              if not pd.isna(values).all()},
+                             index=pd.RangeIndex(len(action_rules), name=self.ACTION_RULE))
+        table[self.ACTION_RULE_TARGET] = [action_rule[0][2][1][1] for action_rule in action_rules]
+        table[self.SUPPORT_BEFORE] = [action_rule[1][0] for action_rule in action_rules]
+        table[self.SUPPORT_AFTER] = [action_rule[1][1] for action_rule in action_rules]
+        table[self.ACTION_RULE_SUPPORT] = [action_rule[1][2] for action_rule in action_rules]
+        table[self.CONFIDENCE_BEFORE] = [action_rule[2][0] for action_rule in action_rules]
+        table[self.CONFIDENCE_AFTER] = [action_rule[2][1] for action_rule in action_rules]
+        table[self.ACTION_RULE_CONFIDENCE] = [action_rule[2][2] for action_rule in action_rules]
+        table[self.ACTION_RULE_UPLIFT] = [action_rule[3] for action_rule in action_rules]
+        return table
+
+    def _get_compact_table(self, rows: pd.Index, rule_ids: np.ndarray) -> pd.DataFrame:
+        """Get the compact output of predict.
+
+        Parameters
+        ----------
+        rows : pd.Index
+            Index values of matched rows.
+        rule_ids : np.ndarray
+            Numbers of matched action rules.
+
+        Returns
+        -------
+        pd.DataFrame
+            Row, action rule and recommended values (categorical) for every match.
+        """
+        compact_table = {self.ROW: rows, self.ACTION_RULE: rule_ids}
+        for column, values in self._get_recommended_values().items():
+            if not pd.isna(values).all():
+                categorical = pd.Categorical(values)
+                compact_table[column] = pd.Categorical.from_codes(categorical.codes[rule_ids],
+                                                                  categories=categorical.categories)
+        return pd.DataFrame(compact_table)
+
+    def _get_top_matches(self, row_positions: np.ndarray, rule_ids: np.ndarray, top_k_per_row: int,
+                         rank_by: str) -> tuple:
+        """Keep just the best matched action rules of every row.
+
+        Parameters
+        ----------
+        row_positions : np.ndarray
+            Row positions of matches.
+        rule_ids : np.ndarray
+            Numbers of action rules of matches.
+        top_k_per_row : int
+            Number of kept action rules of every row.
+        rank_by : str
+            Value used for ranking (see ActionRules.RANK_BY), the earlier action rule wins a tie.
+
+        Returns
+        -------
+        tuple
+            Row positions and numbers of action rules of kept matches (in the original order).
+        """
+        if top_k_per_row < 1:
+            raise Exception("Top k per row must be positive")
+        if rank_by not in ActionRules.RANK_BY:
+            raise Exception("Unknown rank_by " + str(rank_by))
+        if rank_by == "util_dif" and self.action_rules.min_util_dif is None:
+            raise Exception("Ranking by util_dif needs min_util_dif")
+        if rank_by == "profit" and self.action_rules.min_profit is None:
+            raise Exception("Ranking by profit needs min_profit")
+        rank_values = np.array([ActionRules.get_rank_value(action_rule, rank_by)
+                                for action_rule in self.action_rules.action_rules], dtype=float)
+        # Matches sorted by row, the best action rules first
+        order = np.lexsort((rule_ids, -rank_values[rule_ids], row_positions))
+        sorted_rows = row_positions[order]
+        is_first = np.ones(len(order), dtype=bool)
+        is_first[1:] = sorted_rows[1:] != sorted_rows[:-1]
+        first_positions = np.flatnonzero(is_first)
+        ranks = np.arange(len(order)) - np.repeat(first_positions, np.diff(np.append(first_positions, len(order))))
+        kept = np.sort(order[ranks < top_k_per_row])
+        return row_positions[kept], rule_ids[kept]
+
+    def predict(self, source_table: pd.DataFrame, is_compact: bool = False, top_k_per_row: int = None,
+                rank_by: str = "uplift") -> pd.DataFrame:
         """ Predicts if any values would need to change their state.
 
+        All rows are matched to all action rules at once by the compiled index of action rules
+        and the output is built in one step.
+
+        Parameters
+        ----------
+        source_table : pd.DataFrame
+            A data frame with new observations.
+        is_compact : bool = False
+            If true, the output has just the row (index value in source_table), the number of action rule
+            and the recommended values for every match. Metrics of action rules are in get_action_rules_table.
+            DEFAULT: False
+        top_k_per_row : int = None
+            If it is entered, just the best k action rules of every row are in the output (selected before
+            the output is built). None means all matched action rules.
+            DEFAULT: None
+        rank_by : str = "uplift"
+            Value used for top_k_per_row - "uplift", "confidence", "support", "util_dif" (needs min_util_dif)
+            or "profit" (needs min_profit).
+            DEFAULT: "uplift"
+
+        Returns
+        -------
+        pd.DataFrame
+            Returns a data frame with recommended actions. Source columns and recommendations are strings
+            (object), "action rule" is int64 (the old implementation made it float64 if any action rule
+            matched no row), metrics are float64 and "action rule target" is object.
+        """
+        self._finish_lazy_search()
+        if self.action_rules is None or len(self.action_rules.action_rules) == 0:
+            return pd.DataFrame()
+        row_positions, rule_ids = self._get_rule_index().match(source_table)
+        if top_k_per_row is not None:
+            row_positions, rule_ids = self._get_top_matches(row_positions, rule_ids, top_k_per_row, rank_by)
+        return self._get_predicted_table(source_table, row_positions, rule_ids, is_compact)
+
+    def _get_predicted_table(self, source_table: pd.DataFrame, row_positions: np.ndarray, rule_ids: np.ndarray,
+                             is_compact: bool = False) -> pd.DataFrame:
+        """Build the output of predict from matches.
+
         Parameters
         ----------
         source_table : pd.DataFrame
             A data frame with new observations.
+        row_positions : np.ndarray
+            Row positions of matches (ordered by action rule and row).
+        rule_ids : np.ndarray
+            Numbers of action rules of matches.
+        is_compact : bool = False
+            Compact output (see predict).
 
         Returns
         -------
         pd.DataFrame
             Returns a data frame with recommended actions.
         """
-        i = 0
-        full_predicted_table = pd.DataFrame()
-        for classification_before in self.action_rules.classification_before:
-            classification_after = self.action_rules.classification_after[i]
-            decision_before = self.decisions.decision_table.loc[
-                classification_before, self.stable_attributes + self.flexible_attributes]
-            decision_after = self.decisions.decision_table.loc[
-                classification_after, self.stable_attributes + self.flexible_attributes]
-            predicted_table = self._reduce_table_source(decision_before, source_table)
-            if len(predicted_table.index) > 0:
-                for key, value in decision_after.items():
-                    if str(value).lower() != "nan" and key in self.flexible_attributes:
-                        column = key + self.RECOMMENDED
-                        predicted_table[column] = [value] * len(predicted_table.index)
-                        predicted_table[self.ACTION_RULE] = [i] * len(predicted_table.index)
-                        predicted_table = predicted_table.astype({self.ACTION_RULE: int})
-                predicted_table[self.ACTION_RULE_TARGET] = \
-                    [self.action_rules.action_rules[i][0][2][1][1]] * len(predicted_table.index)
-                predicted_table[self.SUPPORT_BEFORE] = \
-                    [self.action_rules.action_rules[i][1][0]] * len(predicted_table.index)
-                predicted_table[self.SUPPORT_AFTER] = \
-                    [self.action_rules.action_rules[i][1][1]] * len(predicted_table.index)
-                predicted_table[self.ACTION_RULE_SUPPORT] = \
-                    [self.action_rules.action_rules[i][1][2]] * len(predicted_table.index)
-                predicted_table[self.CONFIDENCE_BEFORE] = \
-                    [self.action_rules.action_rules[i][2][0]] * len(predicted_table.index)
-                predicted_table[self.CONFIDENCE_AFTER] = \
-                    [self.action_rules.action_rules[i][2][1]] * len(predicted_table.index)
-                predicted_table[self.ACTION_RULE_CONFIDENCE] = \
-                    [self.action_rules.action_rules[i][2][2]] * len(predicted_table.index)
-                predicted_table[self.ACTION_RULE_UPLIFT] = \
-                    [self.action_rules.action_rules[i][3]] * len(predicted_table.index)
-            full_predicted_table = pd.concat([full_predicted_table, predicted_table], sort=True)
-            i += 1
-        # New columns always in the end
-        cols = full_predicted_table.columns.tolist()
-        if len(cols)>0:
-            cols.append(cols.pop(cols.index(self.ACTION_RULE)))
-            cols.append(cols.pop(cols.index(self.ACTION_RULE_TARGET)))
-            cols.append(cols.pop(cols.index(self.SUPPORT_BEFORE)))
-            cols.append(cols.pop(cols.index(self.SUPPORT_AFTER)))
-            cols.append(cols.pop(cols.index(self.ACTION_RULE_SUPPORT)))
-            cols.append(cols.pop(cols.index(self.CONFIDENCE_BEFORE)))
-            cols.append(cols.pop(cols.index(self.CONFIDENCE_AFTER)))
-            cols.append(cols.pop(cols.index(self.ACTION_RULE_CONFIDENCE)))
-            cols.append(cols.pop(cols.index(self.ACTION_RULE_UPLIFT)))
-            full_predicted_table = full_predicted_table[cols]
-        return full_predicted_table
+        if is_compact:
+            return self._get_compact_table(source_table.index[row_positions], rule_ids)
+        # Every matched row is converted to strings once, even if it matches many action rules
+        matched_rows, matched_positions = np.unique(row_positions, return_inverse=True)
+        predicted_table = source_table.iloc[matched_rows].map(str).iloc[matched_positions.reshape(-1)]
+        action_rules_table = self.get_action_rules_table()
+        new_columns = {}
+        for column in action_rules_table.columns:
+            values = action_rules_table[column].to_numpy()[rule_ids]
+            if column in self.PREDICT_METRICS or (len(values) > 0 and not pd.isna(values).all()):
+                new_columns[column] = values
+        new_columns[self.ACTION_RULE] = rule_ids
+        predicted_table = pd.concat([predicted_table,
+                                     pd.DataFrame(new_columns, index=predicted_table.index)], axis=1)
+        # Source columns and recommendations are sorted, new columns always in the end
+        last_columns = [self.ACTION_RULE] + self.PREDICT_METRICS
+        columns = sorted(column for column in predicted_table.columns if column not in last_columns)
+        return predicted_table[columns + last_columns]
+
+    def _get_predict_columns(self, source_columns: list, is_compact: bool = False) -> list:
+        """Get all columns of predict output for the source columns.
+
+        Parameters
+        ----------
+        source_columns : list
+            Columns of the source data frame.
+        is_compact : bool = False
+            Columns of the compact output?
+
+        Returns
+        -------
+        list
+            Source columns and recommendations sorted, new columns in the end.
+        """
+        recommended_columns = [column for column, values in self._get_recommended_values().items()
+                               if not pd.isna(values).all()]
+        if is_compact:
+            return [self.ROW, self.ACTION_RULE] + recommended_columns
+        return sorted(set(source_columns) | set(recommended_columns)) + [self.ACTION_RULE] + self.PREDICT_METRICS
+
+    def predict_chunks(self, chunks: Iterable[pd.DataFrame], is_compact: bool = False, top_k_per_row: int = None,
+                       rank_by: str = "uplift"):
+        """Predict chunk by chunk.
+
+        Every chunk is scored when it is needed, so just one chunk and its output are in memory.
+        All outputs have the same columns (recommendations of all action rules), the rows are in the order
+        of chunks and within a chunk in the order of predict.
+
+        Parameters
+        ----------
+        chunks : Iterable[pd.DataFrame]
+            Data frames with new observations, for example from pd.read_csv with chunksize.
+        is_compact : bool = False
+            Compact output (see predict).
+            DEFAULT: False
+        top_k_per_row : int = None
+            Number of the best action rules of every row (see predict).
+            DEFAULT: None
+        rank_by : str = "uplift"
+            Value used for top_k_per_row (see predict).
+            DEFAULT: "uplift"
+
+        Yields
+        ------
+        pd.DataFrame
+            Data frame with recommended actions for every chunk.
+        """
+        for chunk in chunks:
+            columns = self._get_predict_columns(list(chunk.columns), is_compact)
+            yield self.predict(chunk, is_compact, top_k_per_row, rank_by).reindex(columns=columns)
+
+    def predict_csv(self, file: str, output_file: str = None, chunksize: int = 100000, is_compact: bool = False,
+                    top_k_per_row: int = None, rank_by: str = "uplift", **kwargs):
+        """Predict a CSV file chunk by chunk.
+
+        Parameters
+        ----------
+        file : str
+            The path to a CSV file with new observations.
+        output_file : str = None
+            The path to a CSV file for recommended actions. If it is not entered, the outputs are yielded.
+            DEFAULT: None
+        chunksize : int = 100000
+            Number of rows in one chunk.
+            DEFAULT: 100000
+        is_compact : bool = False
+            Compact output (see predict).
+            DEFAULT: False
+        top_k_per_row : int = None
+            Number of the best action rules of every row (see predict).
+            DEFAULT: None
+        rank_by : str = "uplift"
+            Value used for top_k_per_row (see predict).
+            DEFAULT: "uplift"
+        **kwargs :
+            Arbitrary keyword arguments of Pandas read_csv (the output file uses the same separator).
+
+        Returns
+        -------
+        Generator of data frames (see predict_chunks) or number of written rows if output_file is entered.
+        """
+        # Chunks are read with the data types of training data, so the values are converted to the same strings
+        # (for example, a chunk without missing values would have integers instead of floats)
+        dtype = dict(self.decisions.dtypes)
+        dtype.update(kwargs.pop("dtype", None) or {})
+        chunks = self.predict_chunks(pd.read_csv(file, chunksize=chunksize, dtype=dtype, **kwargs),
+                                     is_compact,
+                                     top_k_per_row,
+                                     rank_by)
+        if output_file is None:
+            return chunks
+        rows_count = 0
+        for position, predicted_table in enumerate(chunks):
+            predicted_table.to_csv(output_file,
+                                   sep=kwargs.get("sep", ","),
+                                   mode="w" if position == 0 else "a",
+                                   header=position == 0,
+                                   index=not is_compact)
+            rows_count += len(predicted_table.index)
+        return rows_count
+
+    @staticmethod
+    def _iter_parquet(parquet_file, batch_size: int, columns: List[str] = None):
+        """Read a Parquet file batch by batch.
+
+        Parameters
+        ----------
+        parquet_file : pyarrow.parquet.ParquetFile
+            Opened Parquet file.
+        batch_size : int
+            Number of rows in one batch.
+        columns : List[str] = None
+            Columns to read, None means all columns.
+
+        Yields
+        ------
+        pd.DataFrame
+            Batch with the index continuing from the previous batch.
+        """
+        start = 0
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk.index))
+            start += len(chunk.index)
+            yield chunk
+
+    def predict_parquet(self, file: str, output_file: str = None, batch_size: int = 100000,
+                        columns: List[str] = None, is_compact: bool = False, top_k_per_row: int = None,
+                        rank_by: str = "uplift"):
+        """Predict a Parquet file chunk by chunk. It needs the package pyarrow.
+
+        Parameters
+        ----------
+        file : str
+            The path to a Parquet file with new observations.
+        output_file : str = None
+            The path to a Parquet file for recommended actions (the row number is in the column "row").
+            If it is not entered, the outputs are yielded.
+            DEFAULT: None
+        batch_size : int = 100000
+            Number of rows in one chunk.
+            DEFAULT: 100000
+        columns : List[str] = None
+            Columns to read, None means all columns.
+            DEFAULT: None
+        is_compact : bool = False
+            Compact output (see predict).
+            DEFAULT: False
+        top_k_per_row : int = None
+            Number of the best action rules of every row (see predict).
+            DEFAULT: None
+        rank_by : str = "uplift"
+            Value used for top_k_per_row (see predict).
+            DEFAULT: "uplift"
+
+        Returns
+        -------
+        Generator of data frames (see predict_chunks) or number of written rows if output_file is entered.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise Exception("Parquet files need the package pyarrow")
+        parquet_file = pq.ParquetFile(file)
+        chunks = self.predict_chunks(self._iter_parquet(parquet_file, batch_size, columns),
+                                     is_compact,
+                                     top_k_per_row,
+                                     rank_by)
+        if output_file is None:
+            return chunks
+        source_columns = columns if columns is not None else parquet_file.schema_arrow.names
+        number_columns = {self.ROW: pa.int64(), self.ACTION_RULE: pa.int64()}
+        for column in self.PREDICT_METRICS[1:]:
+            number_columns[column] = pa.float64()
+        # All chunks must have the same schema, the values of predict output are strings
+        predict_columns = self._get_predict_columns(list(source_columns), is_compact)
+        if not is_compact:
+            predict_columns.insert(0, self.ROW)
+        schema = pa.schema([(column, number_columns.get(column, pa.string())) for column in predict_columns])
+        rows_count = 0
+        with pq.ParquetWriter(output_file, schema) as writer:
+            for predicted_table in chunks:
+                if is_compact:
+                    predicted_table = predicted_table.astype({column: object for column in predict_columns[2:]})
+                else:
+                    predicted_table = predicted_table.rename_axis(self.ROW).reset_index()
+                writer.write_table(pa.Table.from_pandas(predicted_table, schema=schema, preserve_index=False))
+                rows_count += len(predicted_table.index)
+        return rows_count
+
+    def save(self, file: str, is_data: bool = False):
+        """Save the fitted model to a file.
+
+        The action rules are stored in columnar arrays together with the dictionaries of values
+        and just the classification rules used in action rules (see ModelFile). The source data are
+        not saved by default, the loaded model can predict without them.
+
+        Parameters
+        ----------
+        file : str
+            A path to the file (.npz).
+        is_data : bool = False
+            If true, the source data are saved too (get_source_data_for_ar needs them).
+            DEFAULT: False
+        """
+        self._finish_lazy_search()
+        ModelFile.save(self, file, is_data)
+
+    def load(self, file: str):
+        """Load a model saved by save.
+
+        Parameters
+        ----------
+        file : str
+            A path to the file.
+        """
+        if (self.action_rules):
+            raise Exception("Fit was already called")
+        ModelFile.load(self, file)
+        self._rule_index = None
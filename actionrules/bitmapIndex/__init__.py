@@ -0,0 +1 @@
+from .bitmapIndex import *
@@ -0,0 +1,163 @@
+from collections import OrderedDict
+import pandas as pd
+import numpy as np
+
+from actionrules.encoding import Encoding
+
+
+class BitmapIndex:
+    """
+    The class BitmapIndex is a vertical index of the source data. For every attribute=value it holds one packed
+    bitmap over the rows of the data, so the frequency of a set of conditions is just AND of bitmaps and popcount.
+    The bitmaps are built when they are needed for the first time. Frequencies of already counted conditions
+    are kept in a bounded LRU cache.
+
+    ...
+
+    Attributes
+    ----------
+    data : pd.DataFrame
+        Source transaction data.
+    encoding : Encoding
+        Dictionary encoding of values.
+    rows_count : int
+        Number of rows in the data.
+    cache_size : int
+        Maximal number of frequencies in the cache.
+    cache_hits : int
+        Number of frequencies taken from the cache.
+    cache_misses : int
+        Number of frequencies that had to be counted.
+
+    Methods
+    -------
+    get_all(self) -> np.ndarray
+        Get the bitmap with all rows.
+    get_bitmap(self, column: str, value: str) -> np.ndarray
+        Get the bitmap of rows where the column has the value.
+    count(bitmap: np.ndarray) -> int
+        Get the number of rows in a bitmap.
+    get_frequency(self, conditions: list, decision: tuple) -> tuple
+        Get left support and support of conditions.
+    cache_info(self) -> dict
+        Get statistics of the frequency cache.
+    """
+    POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+    def __init__(self, data: pd.DataFrame, encoding: Encoding, cache_size: int = 65536):
+        """Initialise.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Source transaction data.
+        encoding : Encoding
+            Dictionary encoding of values.
+        cache_size : int = 65536
+            Maximal number of frequencies in the cache.
+        """
+        self.data = data
+        self.encoding = encoding
+        self.rows_count = len(data.index)
+        self._codes = {}
+        self._bitmaps = {}
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = OrderedDict()
+
+    def get_all(self) -> np.ndarray:
+        """Get the bitmap with all rows.
+
+        Returns
+        -------
+        np.ndarray
+            Packed bitmap.
+        """
+        return np.packbits(np.ones(self.rows_count, dtype=bool))
+
+    def get_bitmap(self, column: str, value: str) -> np.ndarray:
+        """Get the bitmap of rows where the column has the value.
+
+        Parameters
+        ----------
+        column : str
+            Column name.
+        value : str
+            Value converted to string ("nan" means missing value).
+
+        Returns
+        -------
+        np.ndarray
+            Packed bitmap.
+        """
+        code = self.encoding.get_code(column, value)
+        key = (column, code)
+        if key not in self._bitmaps:
+            if column not in self._codes:
+                self._codes[column] = self.encoding.get_codes(column, self.data[column])
+            self._bitmaps[key] = np.packbits(self._codes[column] == code)
+        return self._bitmaps[key]
+
+    @classmethod
+    def count(cls, bitmap: np.ndarray) -> int:
+        """Get the number of rows in a bitmap.
+
+        Parameters
+        ----------
+        bitmap : np.ndarray
+            Packed bitmap.
+
+        Returns
+        -------
+        int
+            Number of rows.
+        """
+        return int(cls.POPCOUNT[bitmap].sum(dtype=np.int64))
+
+    def get_frequency(self, conditions: list, decision: tuple) -> tuple:
+        """Get left support and support of conditions.
+
+        The result is cached, the key is the sorted tuple of conditions and the decision.
+
+        Parameters
+        ----------
+        conditions : list
+            List of (column, value) of the left side.
+        decision : tuple
+            (column, value) of the consequent.
+
+        Returns
+        -------
+        tuple
+            Left support (number of rows matching conditions) and support (with consequent).
+        """
+        key = (tuple(sorted(conditions, key=lambda condition: (str(condition[0]), str(condition[1])))), decision)
+        if key in self._cache:
+            self.cache_hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        self.cache_misses += 1
+        bitmap = self.get_all()
+        for column, value in conditions:
+            bitmap = bitmap & self.get_bitmap(column, value)
+        left_support = self.count(bitmap)
+        bitmap = bitmap & self.get_bitmap(decision[0], decision[1])
+        frequency = (left_support, self.count(bitmap))
+        self._cache[key] = frequency
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return frequency
+
+    def cache_info(self) -> dict:
+        """Get statistics of the frequency cache.
+
+        Returns
+        -------
+        dict
+            Hits, misses, current size and maximal size of the cache.
+        """
+        return {"hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "size": len(self._cache),
+                "max_size": self.cache_size}
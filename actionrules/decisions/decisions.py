@@ -3,6 +3,10 @@ import pandas as pd
 import numpy as np
 from typing import List
 
+from actionrules.encoding import Encoding
+from actionrules.bitmapIndex import BitmapIndex
+from actionrules.numpyMiner import NumpyMiner
+
 
 class Decisions:
     """
@@ -15,46 +19,95 @@ class Decisions:
     Attributes
     ----------
     data : pd.DataFrame
-        Source transaction data.
+        Source transaction data (categorical columns).
+    dtypes : pd.Series
+        Data types of source columns before they are converted to strings.
+    encoding : Encoding
+        Dictionary encoding of values shared by all parts of the algorithm.
+    bitmap_index : BitmapIndex
+        Vertical index of the source data used for counting of frequencies.
+    item_matrix : np.ndarray
+        Item ids of all rows (rows x attributes), -1 means no item.
     transactions : list
-        Transactions ready for PyFIM.
+        Transactions ready for PyFIM, they are built from item_matrix when they are needed for the first time.
     appearance : set
-        Set of columns ready for PyFIM.
+        Set of items with their side (antecedent or consequent) ready for PyFIM.
+    items : list
+        Attribute and value (column, value) of every item, the item id is the position in the list.
     rules : tuple
         Classification rules from PyFIM.
     decision_table : pd.DataFrame
         Classification rules in Pandas data frame.
-    support : list
-        List of supports.
-    confidence : list
-        List of confidences.
+    support : np.ndarray
+        Supports of classification rules.
+    confidence : np.ndarray
+        Confidences of classification rules.
     max_length : int
         Max length of classification rules.
+    min_length : int
+        Min length of classification rules.
     Methods
     -------
     read_csv(self, file: str, **kwargs)
         Get transaction data from a CSV file.
     load_pandas(self, data_frame: pd.DataFrame)
         Get transaction data from a Pandas data frame.
-    prepare_data_fim(self, antecedent_attributes: List[str], consequent: str)
+    prepare_data_fim(self, antecedent_attributes: List[str], consequent: str, min_length: int = 2,
+                     max_length: int = None, consequent_values: List[str] = None)
         Transform data to be usable in PyFIM.
-    fit_fim_apriori(self, conf: float=70, support: float=10)
+    fit_fim_apriori(self, conf: float=70, support: float=10, rule_mining_mode: str = "all", miner = "auto")
         Train the model with PyFIM.
+    choose_miner(self) -> str
+        Choose the mining algorithm by the size and density of transactions.
+    filter_rules(self, attributes: List[str], min_count: int = 0, max_count: int = None)
+        Keep just the classification rules with the number of attributes in the limits.
     generate_decision_table(self)
         Generate classification rules from the model.
     """
 
+    RULE_MINING_MODES = {"all": "s", "closed": "c", "maximal": "m", "generators": "g"}
+    MINERS = {"apriori": fim.apriori, "fpgrowth": fim.fpgrowth, "eclat": fim.eclat}
+    # Transactions with at least this share of all items in every transaction are dense
+    DENSE_DENSITY = 0.1
+    # Tid lists of Eclat are too big for more transactions
+    MAX_ECLAT_ROWS = 1000000
+
     def __init__(self):
         """Initialise.
         """
         self.data = pd.DataFrame()
+        self.dtypes = pd.Series(dtype=object)
+        self.encoding = Encoding()
+        self.bitmap_index = BitmapIndex(self.data, self.encoding)
+        self.item_matrix = np.empty((0, 0), dtype=np.int64)
+        self._consequent_position = None
         self.transactions = []
         self.appearance = set()
+        self.items = []
         self.rules = ()
         self.decision_table = pd.DataFrame()
         self.support = []
         self.confidence = []
         self.max_length = 10
+        self.min_length = 2
+
+    @property
+    def transactions(self) -> list:
+        """Transactions ready for PyFIM.
+
+        Returns
+        -------
+        list
+            Item ids of every row.
+        """
+        if self._transactions is None:
+            rows = self.item_matrix.tolist()
+            self._transactions = [[item for item in row if item >= 0] for row in rows]
+        return self._transactions
+
+    @transactions.setter
+    def transactions(self, transactions: list):
+        self._transactions = transactions
 
     def read_csv(self, file: str, **kwargs):
         """Loads a data from a CSV file. It uses the Pandas read_csv method.
@@ -67,7 +120,7 @@ class Decisions:
             Arbitrary keyword arguments (the same as in Pandas).
         """
         self.data = pd.read_csv(file, **kwargs)
-        self.data = self.data.map(str)
+        self._encode_data()
 
     def load_pandas(self, data_frame: pd.DataFrame):
         """Loads a data from a Pandas data frame.
@@ -78,33 +131,168 @@ class Decisions:
             Data frame with transaction data.
         """
         self.data = data_frame
+        self._encode_data()
+
+    def _encode_data(self):
+        """Converts all values to strings and encodes them.
+
+        The data are stored in categorical columns which share the dictionaries with the decision table.
+        """
+        self.dtypes = self.data.dtypes
         self.data = self.data.map(str)
+        self.encoding.fit(self.data)
+        self.data = self.encoding.transform(self.data)
+        self.bitmap_index = BitmapIndex(self.data, self.encoding)
 
-    def prepare_data_fim(self, antecedent_attributes: List[str], consequent: str):
+    def prepare_data_fim(self, antecedent_attributes: List[str], consequent: str, min_length: int = 2,
+                         max_length: int = None, consequent_values: List[str] = None):
         """Data preparation for PyFIM.
 
+        Items are integer ids, the attribute and value of an item is in the items list.
+        The item ids are written column by column to item_matrix, transactions are made from it
+        just if they are needed (not for the numpy miner).
+
         Parameters
         ----------
         antecedent_attributes : List[str]
             Antecedent columns names.
         consequent : str
             Consequent column name.
+        min_length : int = 2
+            Min length of classification rules (with consequent).
+            DEFAULT: 2 (at least one antecedent and consequent)
+        max_length : int = None
+            Max length of classification rules (with consequent).
+            DEFAULT: None (number of antecedent attributes + 1)
+        consequent_values : List[str] = None
+            Values of consequent that can be in classification rules, other values are ignored by PyFIM.
+            DEFAULT: None (all values)
         """
+        self.min_length = max(2, min_length)
         self.max_length = len(antecedent_attributes) + 1
-        for index, row in self.data.iterrows():
-            transaction_row = []
-            for i, v in row.items():
-                side_type = None
-                if i == consequent:
-                    side_type = "c"
-                elif i in antecedent_attributes and str(v) != 'nan':
-                    side_type = "a"
-                if side_type:
-                    self.appearance.add((str(i) + "<:> " + str(v), side_type))
-                    transaction_row.append(str(i) + "<:> " + str(v))
-            self.transactions.append(transaction_row)
-
-    def fit_fim_apriori(self, conf: float=70, support: float=10):
+        if max_length is not None:
+            self.max_length = min(self.max_length, max_length)
+        self.items = []
+        self.appearance = set()
+        item_columns = []
+        self._consequent_position = None
+        for column in self.data.columns:
+            if column == consequent:
+                side_type = "c"
+                self._consequent_position = len(item_columns)
+            elif column in antecedent_attributes:
+                side_type = "a"
+            else:
+                continue
+            codes = self.encoding.get_codes(column, self.data[column])
+            is_item = codes != Encoding.NAN_CODE if side_type == "a" else np.ones(len(codes), dtype=bool)
+            column_codes, item_positions = np.unique(codes[is_item], return_inverse=True)
+            item_ids = np.full(len(codes), -1, dtype=np.int64)
+            item_ids[is_item] = item_positions.reshape(-1) + len(self.items)
+            categories = self.encoding.categories[column]
+            for code in column_codes:
+                value = Encoding.NAN_VALUE if code == Encoding.NAN_CODE else categories[code]
+                if side_type == "c" and consequent_values is not None and value not in consequent_values:
+                    self.appearance.add((len(self.items), "n"))
+                else:
+                    self.appearance.add((len(self.items), side_type))
+                self.items.append((column, value))
+            item_columns.append(item_ids)
+        if item_columns:
+            self.item_matrix = np.column_stack(item_columns)
+        else:
+            self.item_matrix = np.empty((len(self.data.index), 0), dtype=np.int64)
+        self.transactions = None
+
+    def choose_miner(self) -> str:
+        """Choose the mining algorithm by the size and density of transactions.
+
+        FP-growth is used for dense transactions (every row has one item of each attribute, so there are
+        few values per attribute) and for very many rows. Eclat is used for sparse transactions.
+
+        Returns
+        -------
+        str
+            Name of the miner ("fpgrowth" or "eclat").
+        """
+        items_count = sum(1 for _, side_type in self.appearance if side_type != "n")
+        if self._transactions is None:
+            rows_count = self.item_matrix.shape[0]
+            transactions_length = int((self.item_matrix >= 0).sum())
+        else:
+            rows_count = len(self._transactions)
+            transactions_length = sum(len(transaction) for transaction in self._transactions)
+        if items_count == 0 or rows_count == 0:
+            return "fpgrowth"
+        density = transactions_length / (rows_count * items_count)
+        if density >= self.DENSE_DENSITY or rows_count > self.MAX_ECLAT_ROWS:
+            return "fpgrowth"
+        return "eclat"
+
+    def _get_miner(self, miner):
+        """Get the mining function.
+
+        Parameters
+        ----------
+        miner : str or callable
+            Name of the miner ("auto", "apriori", "fpgrowth", "eclat", "numpy")
+            or function with the interface of PyFIM.
+
+        Returns
+        -------
+        callable
+            Function with the interface of PyFIM.
+        """
+        if callable(miner):
+            return miner
+        if miner == "auto":
+            miner = self.choose_miner()
+        if miner == "numpy":
+            return self._mine_numpy
+        if miner not in self.MINERS:
+            raise Exception("Unknown miner " + str(miner))
+        return self.MINERS[miner]
+
+    def _mine_numpy(self, item_matrix: np.ndarray, target: str = "s", supp: float = 10, conf: float = 80,
+                    zmin: int = 1, zmax: int = None, **kwargs) -> list:
+        """Mine classification rules by NumpyMiner from item_matrix (transactions are not used).
+
+        It has the interface of PyFIM. Just classification rules (target "r") can be mined, item sets
+        for rule mining modes are mined by the miner chosen by choose_miner.
+
+        Parameters
+        ----------
+        item_matrix : np.ndarray
+            Item ids of all rows (it is used instead of transactions).
+        target : str = "s"
+            PyFIM target.
+        supp : float = 10
+            Minimal support in %.
+        conf : float = 80
+            Minimal confidence in %.
+        zmin : int = 1
+            Minimal length of rules.
+        zmax : int = None
+            Maximal length of rules.
+        **kwargs :
+            Other arguments of PyFIM. They are not used for rules (the report is always "sc", the mode "o"
+            and the appearance is taken from appearance).
+
+        Returns
+        -------
+        list
+            Rules or item sets like from PyFIM.
+        """
+        if target != "r":
+            return self.MINERS[self.choose_miner()](self.transactions, target=target, supp=supp, zmin=zmin,
+                                                    zmax=zmax, **kwargs)
+        item_sides = np.empty(len(self.items), dtype=object)
+        for item, side_type in self.appearance:
+            item_sides[item] = side_type
+        miner = NumpyMiner(item_matrix, self._consequent_position, item_sides)
+        return miner.mine(supp, conf, zmin, zmax)
+
+    def fit_fim_apriori(self, conf: float=70, support: float=10, rule_mining_mode: str = "all", miner = "auto"):
         """Train the model to be able to get classification rules (PyFIM).
 
         Parameters
@@ -115,43 +303,94 @@ class Decisions:
         support : float = 10
             Support.
             DEFAULT: 10%
+        rule_mining_mode : str = "all"
+            Which classification rules are kept - "all", "closed", "maximal" or "generators".
+            Except "all", just the rules whose item set (antecedent and consequent) is a closed
+            or maximal frequent item set or a generator are kept.
+            DEFAULT: "all"
+        miner = "auto"
+            Algorithm of PyFIM - "apriori", "fpgrowth", "eclat", "auto" (chosen by choose_miner)
+            or "numpy" (NumpyMiner on item_matrix, without transactions and PyFIM).
+            It can be also a function with the interface of PyFIM (transactions, target, supp, conf, report,
+            mode, appear, zmin, zmax). All algorithms find the same rules, just their order can be different.
+            DEFAULT: "auto"
+        """
+        if rule_mining_mode not in self.RULE_MINING_MODES:
+            raise Exception("Unknown rule mining mode " + str(rule_mining_mode))
+        mine = self._get_miner(miner)
+        # NumpyMiner works on item_matrix, the transactions are not built for it
+        transactions = self.item_matrix if mine == self._mine_numpy else self.transactions
+        self.rules = mine(transactions,
+                          target="r",
+                          supp=support,
+                          conf=conf,
+                          report="sc",
+                          mode="o",
+                          appear=dict(sorted(self.appearance)),
+                          zmin=self.min_length,
+                          zmax=self.max_length)
+        if rule_mining_mode != "all":
+            item_sets = mine(transactions,
+                             target=self.RULE_MINING_MODES[rule_mining_mode],
+                             supp=support,
+                             zmin=self.min_length,
+                             zmax=self.max_length,
+                             report="")
+            item_sets = {frozenset(item_set[0]) for item_set in item_sets}
+            self.rules = [rule for rule in self.rules if frozenset(rule[1] + (rule[0],)) in item_sets]
+
+    def filter_rules(self, attributes: List[str], min_count: int = 0, max_count: int = None):
+        """Keep just the classification rules with the number of attributes in the limits.
+
+        Parameters
+        ----------
+        attributes : List[str]
+            Column names.
+        min_count : int = 0
+            Minimal number of the attributes in antecedent.
+        max_count : int = None
+            Maximal number of the attributes in antecedent (None means no limit).
         """
-        self.rules = fim.arules(self.transactions,
-                                supp=support,
-                                conf=conf,
-                                report="sc",
-                                mode="o",
-                                appear=dict(self.appearance),
-                                zmin=2,  # At least one antecedent and consequent
-                                zmax=self.max_length)
+        if not self.rules:
+            return
+        attributes = set(attributes)
+        is_attribute = np.array([column in attributes for column, _ in self.items], dtype=np.int64)
+        antecedent_items = np.array([item for rule in self.rules for item in rule[1]], dtype=np.int64)
+        rule_lengths = np.fromiter((len(rule[1]) for rule in self.rules), dtype=np.int64, count=len(self.rules))
+        counts = np.bincount(np.repeat(np.arange(len(self.rules)), rule_lengths),
+                             weights=is_attribute[antecedent_items], minlength=len(self.rules))
+        is_kept = counts >= min_count
+        if max_count is not None:
+            is_kept &= counts <= max_count
+        self.rules = [rule for rule, keep in zip(self.rules, is_kept) if keep]
 
     def generate_decision_table(self):
         """Generates table of classification rules.
 
+        The items of all rules are written to preallocated code arrays, one categorical column per attribute
+        (NaN if the attribute is not in the rule). Columns are in the order of their first appearance in rules.
         """
-        decisions = {}
-        for i, rule in enumerate(self.rules):
-            values = {}
-            # Antecedent
-            for cedent in rule[1]:
-                col = cedent.split("<:> ")[0]
-                value = cedent.split("<:> ")[1]
-                if value.lower() == "nan":
-                    values[col] = np.NaN
-                else:
-                    values[col] = value
-            # Subsequent
-            col = rule[0].split("<:> ")[0]
-            value = rule[0].split("<:> ")[1]
-            if value.lower() == "nan":
-                values[col] = np.NaN
-            else:
-                values[col] = value
-            # Add support and confidence
-            self.support.append(rule[2])
-            self.confidence.append(rule[3])
-            # Add row
-            decisions[i] = values
-        # Dictionary to DataFrame
-        self.decision_table = pd.DataFrame(decisions).T
-
+        rules_count = len(self.rules)
+        self.support = np.fromiter((rule[2] for rule in self.rules), dtype=float, count=rules_count)
+        self.confidence = np.fromiter((rule[3] for rule in self.rules), dtype=float, count=rules_count)
+        columns = list(dict.fromkeys(column for column, _ in self.items))
+        column_positions = {column: position for position, column in enumerate(columns)}
+        item_columns = np.array([column_positions[column] for column, _ in self.items], dtype=np.int64)
+        item_codes = np.array([Encoding.NAN_CODE if value.lower() == "nan"
+                               else self.encoding.categories[column].get_loc(value)
+                               for column, value in self.items], dtype=np.int64)
+        # Antecedent and consequent items of every rule
+        rule_items = [item for rule in self.rules for item in rule[1] + (rule[0],)]
+        rule_lengths = np.fromiter((len(rule[1]) + 1 for rule in self.rules), dtype=np.int64, count=rules_count)
+        rule_items = np.array(rule_items, dtype=np.int64)
+        rule_positions = np.repeat(np.arange(rules_count), rule_lengths)
+        codes = np.full((rules_count, len(columns)), Encoding.NAN_CODE, dtype=np.int64)
+        codes[rule_positions, item_columns[rule_items]] = item_codes[rule_items]
+        # Columns in order of appearance
+        used_columns, first_positions = np.unique(item_columns[rule_items], return_index=True)
+        decision_table = {}
+        for position in used_columns[np.argsort(first_positions)]:
+            column = columns[position]
+            decision_table[column] = pd.Categorical.from_codes(codes[:, position],
+                                                               categories=self.encoding.categories[column])
+        self.decision_table = pd.DataFrame(decision_table, index=range(rules_count))
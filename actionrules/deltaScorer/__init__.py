@@ -0,0 +1 @@
+from .deltaScorer import *
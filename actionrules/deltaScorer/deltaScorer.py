@@ -0,0 +1,172 @@
+import pandas as pd
+import numpy as np
+
+
+class DeltaScorer:
+    """
+    The class DeltaScorer scores a table that changes just a little between calls (e.g. a daily snapshot
+    of customers). The matched action rules of every row are kept by the hash of the row content (values
+    of the columns used in conditions of action rules), so just new or changed rows are matched again.
+    Identical rows are matched once. The output is the same as the output of ActionRulesDiscovery.predict.
+
+    The kept matches are replaced by the matches of the last scored table, so the memory is bounded
+    by the size of the last table. They are dropped if the action rules change.
+
+    ...
+
+    Attributes
+    ----------
+    action_rules_discovery : ActionRulesDiscovery
+        Fitted ActionRulesDiscovery object.
+    is_compact : bool
+        Compact output (see ActionRulesDiscovery.predict).
+    top_k_per_row : int
+        Number of the best action rules of every row (see ActionRulesDiscovery.predict).
+    rank_by : str
+        Value used for top_k_per_row (see ActionRulesDiscovery.predict).
+    rescored_rows_count : int
+        Number of rows matched again in the last call of predict.
+
+    Methods
+    -------
+    predict(self, source_table: pd.DataFrame) -> pd.DataFrame
+        Predicts if any values would need to change their state.
+    clear(self)
+        Drop all kept matches.
+    """
+
+    def __init__(self,
+                 action_rules_discovery,
+                 is_compact: bool = False,
+                 top_k_per_row: int = None,
+                 rank_by: str = "uplift"
+                 ):
+        """Initialise.
+
+        Parameters
+        ----------
+        action_rules_discovery : ActionRulesDiscovery
+            Fitted ActionRulesDiscovery object.
+        is_compact : bool = False
+            Compact output (see ActionRulesDiscovery.predict).
+            DEFAULT: False
+        top_k_per_row : int = None
+            Number of the best action rules of every row (see ActionRulesDiscovery.predict).
+            DEFAULT: None
+        rank_by : str = "uplift"
+            Value used for top_k_per_row (see ActionRulesDiscovery.predict).
+            DEFAULT: "uplift"
+        """
+        self.action_rules_discovery = action_rules_discovery
+        self.is_compact = is_compact
+        self.top_k_per_row = top_k_per_row
+        self.rank_by = rank_by
+        self.rescored_rows_count = 0
+        self.clear()
+
+    def clear(self):
+        """Drop all kept matches."""
+        self._rule_index = None
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._starts = np.zeros(1, dtype=np.int64)
+        self._rule_ids = np.empty(0, dtype=np.int64)
+
+    @staticmethod
+    def _get_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Get all positions of ranges.
+
+        Parameters
+        ----------
+        starts : np.ndarray
+            Starts of ranges.
+        counts : np.ndarray
+            Lengths of ranges.
+
+        Returns
+        -------
+        np.ndarray
+            Positions of all ranges one after another.
+        """
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return offsets + np.arange(len(offsets))
+
+    def _get_hashes(self, source_table: pd.DataFrame) -> np.ndarray:
+        """Get hashes of the content of rows.
+
+        Just the columns used in conditions of action rules are hashed, other columns do not change matches.
+
+        Parameters
+        ----------
+        source_table : pd.DataFrame
+            A data frame with new observations.
+
+        Returns
+        -------
+        np.ndarray
+            Hash of every row.
+        """
+        used_columns = set(column for group in self._rule_index.groups for column in group[0])
+        columns = [column for column in source_table.columns if column in used_columns]
+        return pd.util.hash_pandas_object(source_table[columns], index=False).to_numpy()
+
+    def predict(self, source_table: pd.DataFrame) -> pd.DataFrame:
+        """ Predicts if any values would need to change their state.
+
+        Just the rows with the content not scored in the last call are matched to action rules.
+
+        Parameters
+        ----------
+        source_table : pd.DataFrame
+            A data frame with new observations.
+
+        Returns
+        -------
+        pd.DataFrame
+            Returns a data frame with recommended actions (the same as ActionRulesDiscovery.predict).
+        """
+        action_rules_discovery = self.action_rules_discovery
+        if action_rules_discovery.action_rules is None or len(action_rules_discovery.action_rules.action_rules) == 0:
+            return pd.DataFrame()
+        rule_index = action_rules_discovery._get_rule_index()
+        if rule_index is not self._rule_index:
+            self.clear()
+            self._rule_index = rule_index
+        hashes, first_rows, row_hashes = np.unique(self._get_hashes(source_table),
+                                                   return_index=True,
+                                                   return_inverse=True)
+        row_hashes = row_hashes.reshape(-1)
+        cache_positions = np.minimum(np.searchsorted(self._hashes, hashes), max(len(self._hashes) - 1, 0))
+        is_cached = np.zeros(len(hashes), dtype=bool)
+        if len(self._hashes) > 0:
+            is_cached = self._hashes[cache_positions] == hashes
+        # One row of every new content is matched
+        new_hashes = np.flatnonzero(~is_cached)
+        self.rescored_rows_count = len(new_hashes)
+        new_positions, new_rule_ids = rule_index.match(source_table.iloc[first_rows[new_hashes]])
+        if self.top_k_per_row is not None:
+            new_positions, new_rule_ids = action_rules_discovery._get_top_matches(new_positions,
+                                                                                  new_rule_ids,
+                                                                                  self.top_k_per_row,
+                                                                                  self.rank_by)
+        # Kept matches of the old content and new matches make the matches of this table
+        cache_positions = cache_positions[is_cached]
+        cached_counts = self._starts[cache_positions + 1] - self._starts[cache_positions]
+        counts = np.zeros(len(hashes), dtype=np.int64)
+        counts[is_cached] = cached_counts
+        counts[new_hashes] = np.bincount(new_positions, minlength=len(new_hashes))
+        hash_positions = np.concatenate((np.repeat(np.flatnonzero(is_cached), cached_counts),
+                                         new_hashes[new_positions]))
+        rule_ids = np.concatenate((self._rule_ids[self._get_ranges(self._starts[cache_positions], cached_counts)],
+                                   new_rule_ids))
+        self._hashes = hashes
+        self._starts = np.concatenate(([0], np.cumsum(counts)))
+        self._rule_ids = rule_ids[np.lexsort((rule_ids, hash_positions))]
+        # Matches of all rows ordered by action rule and row like in predict
+        row_counts = counts[row_hashes]
+        row_positions = np.repeat(np.arange(len(row_hashes)), row_counts)
+        rule_ids = self._rule_ids[self._get_ranges(self._starts[row_hashes], row_counts)]
+        order = np.lexsort((row_positions, rule_ids))
+        return action_rules_discovery._get_predicted_table(source_table,
+                                                          row_positions[order],
+                                                          rule_ids[order],
+                                                          self.is_compact)
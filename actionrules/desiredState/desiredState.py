@@ -20,10 +20,14 @@ class DesiredState:
     -------
     is_candidate_decision(self, decision_before: str, decision_after: str) -> bool
         It checks if a pair of consequent values is a candidate.
+    get_allowed_code_pairs(self, values: list) -> set
+        Get all pairs of consequent codes that are candidates.
     is_candidate(self, decision_column: pd.DataFrame) -> bool
         Is it possible to get any action rules (variability, desired classes)?
     get_destination_classes(self) -> List[str]
         Get list of possible desired classes.
+    get_used_classes(self) -> List[str] or None
+        Get the consequent classes that can be in a candidate pair.
     get_not_in_default_classes
         Get the possible before part of consequent.
     """
@@ -176,6 +180,29 @@ class DesiredState:
             return False
         return True
 
+    def get_allowed_code_pairs(self, values: list) -> set:
+        """Get all pairs of consequent codes that are candidates.
+
+        The code of a value is its position in the list of values. The desired state is checked
+        once for every pair of values, then the candidates can be found by set lookup.
+
+        Parameters
+        ----------
+        values : list
+            Unique values of consequent.
+
+        Returns
+        -------
+        set
+            Pairs (before code, after code) of candidates.
+        """
+        allowed_code_pairs = set()
+        for before_code, decision_before in enumerate(values):
+            for after_code, decision_after in enumerate(values):
+                if self.is_candidate_decision(decision_before, decision_after):
+                    allowed_code_pairs.add((before_code, after_code))
+        return allowed_code_pairs
+
     def get_destination_classes(self) -> List[str]:
         """Get all possible desired classes.
 
@@ -192,6 +219,25 @@ class DesiredState:
                 destination_classes.append(desired_change[1])
         return destination_classes
 
+    def get_used_classes(self) -> List[str] or None:
+        """Get the consequent classes that can be in a candidate pair (before or after).
+
+        With desired classes any class can be in the before part, so all classes are used.
+
+        Returns
+        -------
+        List[str] or None
+            Classes from desired changes, None means all classes.
+        """
+        if not self.desired_changes:
+            return None
+        used_classes = []
+        for desired_change in self.desired_changes:
+            for desired_class in desired_change:
+                if desired_class not in used_classes:
+                    used_classes.append(desired_class)
+        return used_classes
+
     def get_not_in_default_classes(self) -> List[str]:
         """Get the possible before part of consequent.
 
@@ -0,0 +1 @@
+from .encoding import *
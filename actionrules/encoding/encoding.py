@@ -0,0 +1,178 @@
+import pandas as pd
+import numpy as np
+
+
+class Encoding:
+    """
+    The class Encoding is a dictionary encoding of attribute values shared by all parts of the algorithm.
+    Every column has its own dictionary (value -> integer code). It is built once when the data are loaded,
+    then the values can be compared as integers instead of strings.
+
+    ...
+
+    Attributes
+    ----------
+    categories : dict
+        Column name -> pd.Index with all known values (the position in the index is the code,
+        the value "nan" gets NAN_CODE).
+
+    Methods
+    -------
+    fit(self, data: pd.DataFrame)
+        Add all values of a data frame to the dictionaries.
+    transform(self, data: pd.DataFrame) -> pd.DataFrame
+        Get a data frame with categorical columns sharing the dictionaries.
+    get_code(self, column: str, value: str) -> int
+        Get the code of one value.
+    get_codes(self, column: str, values: pd.Series) -> np.ndarray
+        Get the codes of values.
+    get_lower_codes(self, column: str, values: pd.Series) -> np.ndarray
+        Get the codes of values where case is ignored.
+    """
+    NAN_CODE = -1
+    UNKNOWN_CODE = -2
+    NAN_VALUE = "nan"
+
+    def __init__(self):
+        """Initialise.
+        """
+        self.categories = {}
+        self._lookups = {}
+        self._lower_lookups = {}
+        self._values = {}
+
+    def fit(self, data: pd.DataFrame):
+        """Add all values of a data frame to the dictionaries.
+
+        Codes of already known values are not changed, new values are appended.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Data frame with values converted to strings.
+        """
+        for column in data.columns:
+            values = data[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.cat.categories
+            uniques = pd.Index(pd.unique(np.asarray(values, dtype=object)))
+            uniques = pd.Index([str(value) for value in uniques[uniques.notna()]], dtype=object)
+            if column in self.categories:
+                known = self.categories[column]
+                uniques = known.append(uniques[~uniques.isin(known)])
+            self.categories[column] = uniques
+            lookup = np.arange(len(uniques), dtype=np.int64)
+            lookup[uniques == self.NAN_VALUE] = self.NAN_CODE
+            self._lookups[column] = lookup
+            self._values[column] = dict(zip(uniques, lookup.tolist()))
+            lower_values = np.array([value.lower() for value in uniques], dtype=object)
+            lower_lookup, _ = pd.factorize(lower_values)
+            lower_lookup = lower_lookup.astype(np.int64)
+            lower_lookup[lower_values == self.NAN_VALUE] = self.NAN_CODE
+            self._lower_lookups[column] = lower_lookup
+
+    def transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Get a data frame with categorical columns sharing the dictionaries.
+
+        The values are the same, but every cell is stored as a small integer.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Data frame with values converted to strings.
+
+        Returns
+        -------
+        pd.DataFrame
+            Data frame with categorical columns.
+        """
+        transformed = data.copy()
+        for column in data.columns:
+            if column in self.categories:
+                transformed[column] = pd.Categorical(data[column], categories=self.categories[column])
+        return transformed
+
+    def get_code(self, column: str, value: str) -> int:
+        """Get the code of one value.
+
+        Parameters
+        ----------
+        column : str
+            Column name.
+        value : str
+            Value converted to string.
+
+        Returns
+        -------
+        int
+            Code of the value, NAN_CODE for missing value and UNKNOWN_CODE for a value that is not in dictionary.
+        """
+        if value == self.NAN_VALUE:
+            return self.NAN_CODE
+        return self._values[column].get(value, self.UNKNOWN_CODE)
+
+    def _get_positions(self, column: str, values: pd.Series) -> np.ndarray:
+        """Get positions of values in the dictionary.
+
+        Parameters
+        ----------
+        column : str
+            Column name.
+        values : pd.Series
+            Values (categorical or converted to strings).
+
+        Returns
+        -------
+        np.ndarray
+            Positions, NAN_CODE for missing values and UNKNOWN_CODE for values that are not in dictionary.
+        """
+        categories = self.categories[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy().astype(np.int64)
+            if values.cat.categories.equals(categories):
+                return codes
+            positions = self._get_positions(column, pd.Series(values.cat.categories, dtype=object))
+            return np.where(codes < 0, self.NAN_CODE, positions[codes])
+        strings = values.map(str).to_numpy()
+        positions = categories.get_indexer(strings).astype(np.int64)
+        positions[positions < 0] = self.UNKNOWN_CODE
+        positions[strings == self.NAN_VALUE] = self.NAN_CODE
+        return positions
+
+    def get_codes(self, column: str, values: pd.Series) -> np.ndarray:
+        """Get the codes of values.
+
+        Parameters
+        ----------
+        column : str
+            Column name.
+        values : pd.Series
+            Values (categorical or converted to strings).
+
+        Returns
+        -------
+        np.ndarray
+            Codes, NAN_CODE for missing values and UNKNOWN_CODE for values that are not in dictionary.
+        """
+        positions = self._get_positions(column, values)
+        return np.where(positions < 0, positions, self._lookups[column][np.maximum(positions, 0)])
+
+    def get_lower_codes(self, column: str, values: pd.Series) -> np.ndarray:
+        """Get the codes of values where case is ignored.
+
+        Values that differ only in case get the same code (the same comparison as in ActionRules).
+
+        Parameters
+        ----------
+        column : str
+            Column name.
+        values : pd.Series
+            Values (categorical or converted to strings).
+
+        Returns
+        -------
+        np.ndarray
+            Codes, NAN_CODE for missing values and UNKNOWN_CODE for values that are not in dictionary.
+        """
+        positions = self._get_positions(column, values)
+        return np.where(positions < 0, positions, self._lower_lookups[column][np.maximum(positions, 0)])
@@ -0,0 +1 @@
+from .modelFile import *
@@ -0,0 +1,324 @@
+import json
+import pandas as pd
+import numpy as np
+
+from actionrules import __version__
+from actionrules.actionRules import ActionRules
+from actionrules.bitmapIndex import BitmapIndex
+from actionrules.desiredState import DesiredState
+
+
+class ModelFile:
+    """
+    The class ModelFile saves a fitted model to one file and loads it back. The file is a compressed NumPy
+    archive (.npz) without pickled objects:
+
+    - header - JSON with the format version, settings of the model, data types and column names,
+    - dictionaries of the encoding - all values of all columns in one array,
+    - classification rules - just the rows of the decision table used in action rules, stored as codes,
+    - action rules - columnar arrays of metrics and of the couples of stable and flexible attributes,
+    - source data (optional) - codes of all rows.
+
+    The loaded model has everything that predict needs, so a service loads it in milliseconds
+    without the training data.
+
+    ...
+
+    Attributes
+    ----------
+    FORMAT : str
+        Name of the format in the header.
+    VERSION : int
+        Version of the format, files of newer versions cannot be loaded.
+
+    Methods
+    -------
+    save(action_rules_discovery, file: str, is_data: bool = False)
+        Save a fitted model.
+    load(action_rules_discovery, file: str)
+        Load a model saved by save.
+    """
+    FORMAT = "actionrules-model"
+    VERSION = 1
+    STABLE = 0
+    FLEXIBLE = 1
+    # Metrics in the order of the columns of the matrix "metrics"
+    METRICS = ("support before", "support after", "action rule support",
+               "confidence before", "confidence after", "action rule confidence",
+               "uplift", "util_dif", "profit")
+
+    @staticmethod
+    def _get_strings(values: list) -> np.ndarray:
+        """Get an array of strings (NumPy unicode, so it is stored without pickle).
+
+        Parameters
+        ----------
+        values : list
+            Values.
+
+        Returns
+        -------
+        np.ndarray
+            Values converted to strings.
+        """
+        return np.array([str(value) for value in values], dtype=str).reshape(-1)
+
+    @staticmethod
+    def _get_category_codes(values: pd.Series, categories: pd.Index) -> np.ndarray:
+        """Get positions of values in categories, -1 for missing values.
+
+        Parameters
+        ----------
+        values : pd.Series
+            Values (categorical or strings).
+        categories : pd.Index
+            Categories of the column.
+
+        Returns
+        -------
+        np.ndarray
+            Codes of values.
+        """
+        return pd.Categorical(values.astype(object), categories=categories).codes.astype(np.int32)
+
+    @staticmethod
+    def _get_metrics(action_rule: list) -> list:
+        """Get all metrics of an action rule.
+
+        Parameters
+        ----------
+        action_rule : list
+            Action rule with its supports, confidences, uplift, utility difference and profit.
+
+        Returns
+        -------
+        list
+            Metrics in the order of METRICS.
+        """
+        return list(action_rule[1]) + list(action_rule[2]) + list(action_rule[3:6])
+
+    @staticmethod
+    def save(action_rules_discovery, file: str, is_data: bool = False):
+        """Save a fitted model.
+
+        Parameters
+        ----------
+        action_rules_discovery : ActionRulesDiscovery
+            Fitted ActionRulesDiscovery object.
+        file : str
+            A path to the file.
+        is_data : bool = False
+            If true, the source data are saved too (get_source_data_for_ar needs them).
+            DEFAULT: False
+
+        Raises
+        ------
+        Exception
+            If the model is not fitted, it is lazy or the classification rules are not in the decision table.
+        """
+        action_rules = action_rules_discovery.action_rules
+        if not action_rules:
+            raise Exception("Fit must be called first")
+        if action_rules_discovery.is_lazy:
+            raise Exception("Lazy model does not keep action rules, it cannot be saved")
+        decisions = action_rules_discovery.decisions
+        encoding = decisions.encoding
+        rules = action_rules.action_rules
+        rules_count = len(rules)
+        classification_before = np.asarray(action_rules.classification_before[:rules_count], dtype=np.int64)
+        classification_after = np.asarray(action_rules.classification_after[:rules_count], dtype=np.int64)
+        decision_rows = np.union1d(classification_before, classification_after)
+        decision_table = decisions.decision_table
+        if not pd.Index(decision_rows).isin(decision_table.index).all():
+            raise Exception("Classification rules of action rules are not in the decision table")
+        decision_table = decision_table.loc[decision_rows]
+        decision_columns = list(decision_table.columns)
+        data_columns = list(decisions.data.columns) if is_data else []
+        # Just the dictionaries of used columns are needed
+        encoding_columns = [column for column in dict.fromkeys(decision_columns + data_columns)
+                            if column in encoding.categories]
+        desired_state = action_rules.desired_state
+        header = {
+            "format": ModelFile.FORMAT,
+            "version": ModelFile.VERSION,
+            "package_version": __version__,
+            "stable_attributes": action_rules_discovery.stable_attributes,
+            "flexible_attributes": action_rules_discovery.flexible_attributes,
+            "consequent": action_rules_discovery.consequent,
+            "desired_classes": desired_state.desired_classes,
+            "desired_changes": desired_state.desired_changes,
+            "is_nan": action_rules.is_nan,
+            "min_stable_antecedents": action_rules.min_stable_antecedents,
+            "min_flexible_antecedents": action_rules.min_flexible_antecedents,
+            "max_stable_antecedents": action_rules.max_stable_antecedents,
+            "max_flexible_antecedents": action_rules.max_flexible_antecedents,
+            "is_strict_flexible": action_rules.is_strict_flexible,
+            "min_util_dif": action_rules.min_util_dif,
+            "min_profit": action_rules.min_profit,
+            "sort_by_util_dif": action_rules.sort_by_util_dif,
+            "top_k": action_rules.top_k,
+            "rank_by": action_rules.rank_by,
+            "dtypes": {str(column): str(dtype) for column, dtype in decisions.dtypes.items()},
+            "encoding_columns": encoding_columns,
+            "decision_columns": decision_columns,
+            "data_columns": data_columns,
+        }
+        # Couples of stable and flexible attributes of all action rules one after another
+        part_rules = []
+        part_kinds = []
+        part_columns = []
+        part_values = []
+        part_sizes = []
+        for rule_position, action_rule in enumerate(rules):
+            for kind in (ModelFile.STABLE, ModelFile.FLEXIBLE):
+                for column, values in action_rule[0][kind]:
+                    part_rules.append(rule_position)
+                    part_kinds.append(kind)
+                    part_columns.append(column)
+                    part_values.append((values[0], values[-1]))
+                    part_sizes.append(len(values))
+        attribute_columns = list(dict.fromkeys(part_columns))
+        rule_metrics = [ModelFile._get_metrics(action_rule) for action_rule in rules]
+        arrays = {
+            "header": np.array(json.dumps(header)),
+            "category_values": ModelFile._get_strings([value for column in encoding_columns
+                                                       for value in encoding.categories[column]]),
+            "category_counts": np.array([len(encoding.categories[column]) for column in encoding_columns],
+                                        dtype=np.int64),
+            "decision_rows": decision_rows,
+            "decision_codes": np.column_stack(
+                [ModelFile._get_category_codes(decision_table[column], encoding.categories[column])
+                 for column in decision_columns]
+            ) if decision_columns else np.empty((len(decision_rows), 0), dtype=np.int32),
+            "classification_before": classification_before,
+            "classification_after": classification_after,
+            # None is stored as NaN with is_none, integers (e.g. zero confidence) keep their type by is_integer
+            "metrics": np.array([[np.nan if value is None else value for value in metrics]
+                                 for metrics in rule_metrics], dtype=float).reshape(-1, len(ModelFile.METRICS)),
+            "is_none": np.array([[value is None for value in metrics] for metrics in rule_metrics],
+                                dtype=bool).reshape(-1, len(ModelFile.METRICS)),
+            "is_integer": np.array([[isinstance(value, (int, np.integer)) for value in metrics]
+                                    for metrics in rule_metrics], dtype=bool).reshape(-1, len(ModelFile.METRICS)),
+            "decision_values": ModelFile._get_strings([value for action_rule in rules
+                                                       for value in action_rule[0][2][1]]).reshape(-1, 2),
+            "attribute_columns": ModelFile._get_strings(attribute_columns),
+            "part_rules": np.array(part_rules, dtype=np.int64),
+            "part_kinds": np.array(part_kinds, dtype=np.int8),
+            "part_columns": pd.Index(attribute_columns).get_indexer(part_columns).astype(np.int32),
+            "part_values": ModelFile._get_strings([value for values in part_values for value in values]).reshape(-1, 2),
+            "part_sizes": np.array(part_sizes, dtype=np.int8),
+        }
+        if is_data:
+            arrays["data_index"] = np.asarray(decisions.data.index)
+            if arrays["data_index"].dtype == object:
+                arrays["data_index"] = ModelFile._get_strings(decisions.data.index)
+            arrays["data_codes"] = np.column_stack(
+                [ModelFile._get_category_codes(decisions.data[column], encoding.categories[column])
+                 for column in data_columns]
+            ) if data_columns else np.empty((len(decisions.data.index), 0), dtype=np.int32)
+        np.savez_compressed(file, **arrays)
+
+    @staticmethod
+    def _get_action_rules(arrays, consequent: str) -> list:
+        """Build the action rules from columnar arrays.
+
+        Parameters
+        ----------
+        arrays : dict
+            Loaded arrays.
+        consequent : str
+            The name of consequent.
+
+        Returns
+        -------
+        list
+            Action rules in the same form as get_action_rules.
+        """
+        metrics = arrays["metrics"].astype(object)
+        is_integer = arrays["is_integer"]
+        metrics[is_integer] = arrays["metrics"][is_integer].astype(np.int64).tolist()
+        metrics[arrays["is_none"]] = None
+        action_rules = [[[[], [], [consequent, values]], rule_metrics[0:3], rule_metrics[3:6]] + rule_metrics[6:9]
+                        for values, rule_metrics in zip(arrays["decision_values"].tolist(), metrics.tolist())]
+        attribute_columns = arrays["attribute_columns"].tolist()
+        for rule_position, kind, column, values, size in zip(arrays["part_rules"].tolist(),
+                                                             arrays["part_kinds"].tolist(),
+                                                             arrays["part_columns"].tolist(),
+                                                             arrays["part_values"].tolist(),
+                                                             arrays["part_sizes"].tolist()):
+            action_rules[rule_position][0][kind].append([attribute_columns[column], tuple(values[:size])])
+        return action_rules
+
+    @staticmethod
+    def load(action_rules_discovery, file: str):
+        """Load a model saved by save.
+
+        Parameters
+        ----------
+        action_rules_discovery : ActionRulesDiscovery
+            New ActionRulesDiscovery object.
+        file : str
+            A path to the file.
+
+        Raises
+        ------
+        Exception
+            If the file has another format or a newer version.
+        """
+        with np.load(file, allow_pickle=False) as npz_file:
+            # Every access to NpzFile reads the array again
+            arrays = {name: npz_file[name] for name in npz_file.files}
+        header = json.loads(str(arrays["header"])) if "header" in arrays else {}
+        if header.get("format") != ModelFile.FORMAT:
+            raise Exception("File " + str(file) + " is not a saved model")
+        if header["version"] > ModelFile.VERSION:
+            raise Exception("Version " + str(header["version"]) + " of the saved model is not supported")
+        decisions = action_rules_discovery.decisions
+        encoding = decisions.encoding
+        category_values = arrays["category_values"].astype(object)
+        category_ends = np.cumsum(arrays["category_counts"])
+        for column, values in zip(header["encoding_columns"], np.split(category_values, category_ends[:-1])):
+            encoding.fit(pd.DataFrame({column: values}))
+        decisions.dtypes = pd.Series({column: pd.api.types.pandas_dtype(dtype)
+                                      for column, dtype in header["dtypes"].items()}, dtype=object)
+        decision_codes = arrays["decision_codes"]
+        decisions.decision_table = pd.DataFrame(
+            {column: pd.Categorical.from_codes(decision_codes[:, position],
+                                               categories=encoding.categories[column])
+             for position, column in enumerate(header["decision_columns"])},
+            index=arrays["decision_rows"])
+        if "data_codes" in arrays:
+            data_codes = arrays["data_codes"]
+            decisions.data = pd.DataFrame(
+                {column: pd.Categorical.from_codes(data_codes[:, position],
+                                                   categories=encoding.categories[column])
+                 for position, column in enumerate(header["data_columns"])},
+                index=arrays["data_index"])
+            decisions.bitmap_index = BitmapIndex(decisions.data, encoding)
+        action_rules_discovery.stable_attributes = header["stable_attributes"]
+        action_rules_discovery.flexible_attributes = header["flexible_attributes"]
+        action_rules_discovery.consequent = header["consequent"]
+        action_rules_discovery.desired_state = DesiredState(desired_classes=header["desired_classes"],
+                                                            desired_changes=header["desired_changes"])
+        action_rules = ActionRules([],
+                                   [],
+                                   [],
+                                   action_rules_discovery.desired_state,
+                                   decisions,
+                                   [],
+                                   [],
+                                   header["is_nan"],
+                                   header["min_stable_antecedents"],
+                                   header["min_flexible_antecedents"],
+                                   header["max_stable_antecedents"],
+                                   header["max_flexible_antecedents"],
+                                   header["is_strict_flexible"],
+                                   min_util_dif=header["min_util_dif"],
+                                   min_profit=header["min_profit"],
+                                   sort_by_util_dif=header["sort_by_util_dif"],
+                                   top_k=header["top_k"],
+                                   rank_by=header["rank_by"])
+        action_rules.action_rules = ModelFile._get_action_rules(arrays, header["consequent"])
+        action_rules.classification_before = arrays["classification_before"].tolist()
+        action_rules.classification_after = arrays["classification_after"].tolist()
+        action_rules_discovery.action_rules = action_rules
@@ -0,0 +1 @@
+from .numpyMiner import *
@@ -0,0 +1,220 @@
+import math
+import sys
+import numpy as np
+
+
+class NumpyMiner:
+    """
+    The class NumpyMiner mines classification rules directly from the matrix of item ids, without transactions
+    and without PyFIM. Every row has at most one item of every attribute, so an item set is a set of values
+    of different attributes. The item sets are searched level by level, the rows of all item sets of one level
+    are kept in one array and the supports of all their extensions with all consequent items are counted at once
+    by numpy.bincount. Identical rows are merged at the beginning.
+
+    It finds the same rules with the same support and confidence as PyFIM (arules with mode="o"),
+    the order of rules is different.
+
+    ...
+
+    Attributes
+    ----------
+    item_matrix : np.ndarray
+        Item ids (rows x attributes), -1 means that the row has no item of the attribute.
+    consequent_position : int
+        Position of the consequent column in the matrix.
+    item_sides : np.ndarray
+        Appearance of every item id - "a" (antecedent), "c" (consequent) or "n" (ignored).
+
+    Methods
+    -------
+    mine(self, supp: float, conf: float, zmin: int = 2, zmax: int = None) -> list
+        Mine classification rules.
+    """
+    EPSILON = sys.float_info.epsilon
+
+    def __init__(self, item_matrix: np.ndarray, consequent_position: int, item_sides: np.ndarray):
+        """Initialise.
+
+        Parameters
+        ----------
+        item_matrix : np.ndarray
+            Item ids (rows x attributes), -1 means that the row has no item of the attribute.
+            Items of one attribute must have consecutive ids.
+        consequent_position : int
+            Position of the consequent column in the matrix.
+        item_sides : np.ndarray
+            Appearance of every item id - "a" (antecedent), "c" (consequent) or "n" (ignored).
+        """
+        self.item_matrix = item_matrix
+        self.consequent_position = consequent_position
+        self.item_sides = np.asarray(item_sides)
+        self._rules = []
+
+    @staticmethod
+    def _get_row_keys(matrix: np.ndarray) -> np.ndarray:
+        """Get one integer key of every row, identical rows have the same key.
+
+        Parameters
+        ----------
+        matrix : np.ndarray
+            Matrix of codes (-1 or more).
+
+        Returns
+        -------
+        np.ndarray
+            Keys of rows.
+        """
+        keys = np.zeros(matrix.shape[0], dtype=np.int64)
+        radix = 1
+        for column in matrix.T:
+            size = int(column.max(initial=-1)) + 2
+            if radix * size >= 2 ** 62:
+                # Renumber the keys before they overflow
+                _, keys = np.unique(keys, return_inverse=True)
+                keys = keys.reshape(-1).astype(np.int64)
+                radix = int(keys.max(initial=0)) + 1
+            keys = keys * size + column + 1
+            radix *= size
+        return keys
+
+    def _prepare(self):
+        """Prepare the matrix of antecedent items and consequent codes.
+
+        Identical rows are merged into one row with a weight, so repeated rows are counted just once.
+        """
+        antecedent_positions = [position for position in range(self.item_matrix.shape[1])
+                                if position != self.consequent_position]
+        antecedents = self.item_matrix[:, antecedent_positions]
+        is_used = antecedents >= 0
+        is_used[is_used] = self.item_sides[antecedents[is_used]] == "a"
+        antecedents = np.where(is_used, antecedents, -1)
+        heads = self.item_matrix[:, self.consequent_position]
+        is_head = heads >= 0
+        is_head[is_head] = self.item_sides[heads[is_head]] == "c"
+        self._head_items = np.unique(heads[is_head])
+        head_codes = np.full(len(heads), -1, dtype=np.int64)
+        head_codes[is_head] = np.searchsorted(self._head_items, heads[is_head])
+        matrix = np.column_stack((antecedents, head_codes))
+        _, first_rows, weights = np.unique(self._get_row_keys(matrix), return_index=True, return_counts=True)
+        self._antecedents = matrix[first_rows, :-1]
+        self._head_codes = matrix[first_rows, -1]
+        self._weights = weights
+        # Position of the antecedent column of every item
+        self._item_positions = np.full(len(self.item_sides), -1, dtype=np.int64)
+        for position in range(self._antecedents.shape[1]):
+            column = self._antecedents[:, position]
+            self._item_positions[np.unique(column[column >= 0])] = position
+
+    def _add_rules(self, bodies: list, pair_nodes: np.ndarray, pair_items: np.ndarray, body_counts: np.ndarray,
+                   head_counts: np.ndarray):
+        """Add the rules of all extensions of item sets.
+
+        Parameters
+        ----------
+        bodies : list
+            Antecedent item ids of every item set.
+        pair_nodes : np.ndarray
+            Item set of every extension.
+        pair_items : np.ndarray
+            Item id of every extension.
+        body_counts : np.ndarray
+            Number of rows with every extension.
+        head_counts : np.ndarray
+            Number of rows with every extension and every consequent item (extensions x consequent items).
+        """
+        is_rule = (head_counts >= self._min_count) & \
+                  (head_counts >= self._min_conf * body_counts[:, None] * (1 - self.EPSILON))
+        for pair, head in zip(*np.nonzero(is_rule)):
+            count = int(head_counts[pair, head])
+            self._rules.append((int(self._head_items[head]),
+                                bodies[pair_nodes[pair]] + (int(pair_items[pair]),),
+                                count / self._total,
+                                count / int(body_counts[pair])))
+
+    def _search(self):
+        """Search all item sets level by level.
+
+        An item set is a node, the rows of all nodes of one level are in one array (entries of node and row).
+        Every level is extended at once - all items of the next columns of all entries are counted together.
+        """
+        heads_count = len(self._head_items)
+        items_count = len(self.item_sides)
+        columns = np.arange(self._antecedents.shape[1])
+        entry_rows = np.arange(len(self._weights))
+        entry_nodes = np.zeros(len(entry_rows), dtype=np.int64)
+        node_positions = np.array([-1])
+        bodies = [()]
+        length = 2
+        while len(entry_rows) > 0:
+            items = self._antecedents[entry_rows]
+            is_item = (items >= 0) & (columns[None, :] > node_positions[entry_nodes][:, None])
+            entries, positions = np.nonzero(is_item)
+            rows = entry_rows[entries]
+            # Extensions are pairs (node, item)
+            pairs, pair_positions = np.unique(entry_nodes[entries] * items_count + items[entries, positions],
+                                              return_inverse=True)
+            pair_positions = pair_positions.reshape(-1)
+            weights = self._weights[rows]
+            heads = self._head_codes[rows]
+            is_head = heads >= 0
+            body_counts = np.bincount(pair_positions, weights=weights, minlength=len(pairs)).astype(np.int64)
+            head_counts = np.bincount(pair_positions[is_head] * heads_count + heads[is_head],
+                                      weights=weights[is_head], minlength=len(pairs) * heads_count)
+            head_counts = head_counts.astype(np.int64).reshape(len(pairs), heads_count)
+            is_frequent = head_counts.max(axis=1, initial=0) >= self._min_count
+            pair_nodes = pairs // items_count
+            pair_items = pairs % items_count
+            if length >= self._zmin:
+                self._add_rules(bodies, pair_nodes[is_frequent], pair_items[is_frequent],
+                                body_counts[is_frequent], head_counts[is_frequent])
+            if length >= self._zmax:
+                break
+            # Frequent extensions that can be extended again are nodes of the next level
+            is_frequent &= self._item_positions[pair_items] + 1 < len(columns)
+            new_nodes = np.full(len(pairs), -1, dtype=np.int64)
+            new_nodes[is_frequent] = np.arange(np.count_nonzero(is_frequent))
+            entry_nodes = new_nodes[pair_positions]
+            is_kept = entry_nodes >= 0
+            entry_nodes = entry_nodes[is_kept]
+            entry_rows = rows[is_kept]
+            node_positions = self._item_positions[pair_items[is_frequent]]
+            bodies = [bodies[node] + (int(item),) for node, item in zip(pair_nodes[is_frequent],
+                                                                         pair_items[is_frequent])]
+            length += 1
+
+    def mine(self, supp: float, conf: float, zmin: int = 2, zmax: int = None) -> list:
+        """Mine classification rules.
+
+        The thresholds are the same as in PyFIM.
+
+        Parameters
+        ----------
+        supp : float
+            Minimal support in % (negative value is the minimal number of rows).
+        conf : float
+            Minimal confidence in %.
+        zmin : int = 2
+            Minimal number of items in a rule (with consequent).
+        zmax : int = None
+            Maximal number of items in a rule (with consequent), None means no limit.
+
+        Returns
+        -------
+        list
+            Rules (consequent item, antecedent items, support, confidence) like from PyFIM with report="sc".
+        """
+        self._total = self.item_matrix.shape[0]
+        self._rules = []
+        if self._total == 0 or self.consequent_position is None:
+            return self._rules
+        if supp >= 0:
+            self._min_count = max(1, math.ceil(supp / 100 * self._total * (1 - self.EPSILON)))
+        else:
+            self._min_count = -supp
+        self._min_conf = conf / 100
+        self._zmin = max(2, zmin)
+        self._zmax = zmax if zmax is not None else self.item_matrix.shape[1]
+        self._prepare()
+        if self._zmax >= 2 and len(self._head_items) > 0 and self._antecedents.shape[1] > 0:
+            self._search()
+        return self._rules
@@ -0,0 +1 @@
+from .pairMatching import *
@@ -0,0 +1,313 @@
+import pandas as pd
+import numpy as np
+
+from actionrules.desiredState import DesiredState
+from actionrules.encoding import Encoding
+
+
+class PairMatching:
+    """
+    The class PairMatching is a vectorized engine for action rules discovery. It encodes a reduction
+    table into integer code matrices and evaluates the stable and flexible couple conditions for whole
+    blocks of before x after pairs at once. Only the pairs that can make an action rule are returned,
+    in the same order as they would be visited by itertools.product.
+
+    ...
+
+    Attributes
+    ----------
+    desired_state : DesiredState
+        DesiredState object.
+    is_nan : bool
+        True means NaN values are used, False means NaN values are not used.
+    is_strict_flexible : bool
+        If true flexible attributes must be always actionable, if false they can also behave as stable attributes
+    min_stable_antecedents : int
+        Minimal number of stable pairs.
+    min_flexible_antecedents : int
+        Minimal number of flexible pairs.
+    max_stable_antecedents : int
+        Maximal number of stable pairs.
+    max_flexible_antecedents : int
+        Maximal number of flexible pairs.
+    block_size : int
+        Maximal number of pairs evaluated at once.
+    encoding : Encoding
+        Dictionary encoding of values.
+    used_pairs : np.ndarray
+        Keys of already used pairs (just for reduction by nan).
+
+    Methods
+    -------
+    set_pair_keys(self, index: pd.Index)
+        Set the index of all classification rules used for the pair keys.
+    find_pairs(self,
+               stable_columns: pd.DataFrame,
+               flexible_columns: pd.DataFrame,
+               decision_column: pd.DataFrame,
+               before_indexes: np.ndarray,
+               after_indexes: np.ndarray,
+               pair_filter: tuple = None) -> list
+        Find all pairs that can make an action rule.
+    """
+    NAN_CODE = Encoding.NAN_CODE
+
+    def __init__(self,
+                 desired_state: DesiredState,
+                 is_nan: bool = False,
+                 is_strict_flexible: bool = True,
+                 min_stable_antecedents: int = 1,
+                 min_flexible_antecedents: int = 1,
+                 max_stable_antecedents: int = 1,
+                 max_flexible_antecedents: int = 1,
+                 block_size: int = 262144,
+                 encoding: Encoding = None
+                 ):
+        """Initialise.
+
+        Parameters
+        ----------
+        desired_state : DesiredState
+            DesiredState object.
+        is_nan : bool
+            True means NaN values are used, False means NaN values are not used.
+        is_strict_flexible : bool
+            If true flexible attributes must be always actionable, if false they can also behave as stable attributes
+        min_stable_antecedents : int
+            Minimal number of stable pairs.
+        min_flexible_antecedents : int
+            Minimal number of flexible pairs.
+        max_stable_antecedents : int
+            Maximal number of stable pairs.
+        max_flexible_antecedents : int
+            Maximal number of flexible pairs.
+        block_size : int = 262144
+            Maximal number of pairs evaluated at once.
+        encoding : Encoding = None
+            Dictionary encoding of values (usually the one from Decisions).
+            If it is not entered, the values of every table are added to a new encoding.
+        """
+        self.desired_state = desired_state
+        self.is_nan = is_nan
+        self.is_strict_flexible = is_strict_flexible
+        self.min_stable_antecedents = min_stable_antecedents
+        self.min_flexible_antecedents = min_flexible_antecedents
+        self.max_stable_antecedents = max_stable_antecedents
+        self.max_flexible_antecedents = max_flexible_antecedents
+        self.block_size = block_size
+        self._is_own_encoding = encoding is None
+        if self._is_own_encoding:
+            encoding = Encoding()
+        self.encoding = encoding
+        self.used_pairs = np.empty(0, dtype=np.int64)
+        self._pair_keys = None
+        self._cache = {}
+
+    def set_pair_keys(self, index: pd.Index):
+        """Set the index of all classification rules. Positions in the index are used as keys of pairs.
+
+        Parameters
+        ----------
+        index : pd.Index
+            Index of all classification rules.
+        """
+        self._pair_keys = pd.Index(index).unique()
+
+    def _get_cached(self, name: str, table: pd.DataFrame, function):
+        """Get the result of function for a table, it is computed again only if the table changes.
+
+        Reduction tables usually share the same base tables, so they are encoded just once.
+
+        Parameters
+        ----------
+        name : str
+            Name of the cached item.
+        table : pd.DataFrame
+            Data frame.
+        function : callable
+            Function computing the result from the table.
+
+        Returns
+        -------
+        Result of the function.
+        """
+        if name not in self._cache or self._cache[name][0] is not table:
+            self._cache[name] = (table, function(table))
+        return self._cache[name][1]
+
+    def _encode(self, table: pd.DataFrame) -> np.ndarray:
+        """Encode all columns of a table to integer codes.
+
+        The values are compared the same way as in ActionRules (case is ignored), NaN values get NAN_CODE.
+
+        Parameters
+        ----------
+        table : pd.DataFrame
+            Data frame with stable or flexible attributes.
+
+        Returns
+        -------
+        np.ndarray
+            Matrix of codes (rows x columns).
+        """
+        if self._is_own_encoding:
+            self.encoding.fit(table)
+        else:
+            missing_columns = [column for column in table.columns if column not in self.encoding.categories]
+            if missing_columns:
+                self.encoding.fit(table[missing_columns])
+        codes = np.empty((len(table.index), len(table.columns)), dtype=np.int64)
+        for position, column in enumerate(table.columns):
+            codes[:, position] = self.encoding.get_lower_codes(column, table[column])
+        return codes
+
+    def _get_allowed_decisions(self, decision_column: pd.DataFrame) -> tuple:
+        """Encode consequent and get the matrix of allowed changes.
+
+        Parameters
+        ----------
+        decision_column : pd.DataFrame
+            Data frame with consequent.
+
+        Returns
+        -------
+        tuple
+            Codes of consequent and boolean matrix of allowed (before, after) codes.
+        """
+        decision_codes, uniques = pd.factorize(decision_column.iloc[:, 0], use_na_sentinel=False)
+        allowed = np.zeros((len(uniques), len(uniques)), dtype=bool)
+        for before_code, after_code in self.desired_state.get_allowed_code_pairs(list(uniques)):
+            allowed[before_code, after_code] = True
+        return decision_codes, allowed
+
+    def _stable_block(self, before: np.ndarray, after: np.ndarray) -> tuple:
+        """Evaluate stable couples for a block of pairs.
+
+        Parameters
+        ----------
+        before : np.ndarray
+            Stable codes of before candidates.
+        after : np.ndarray
+            Stable codes of after candidates.
+
+        Returns
+        -------
+        tuple
+            Mask of pairs that break the rule and number of stable pairs.
+        """
+        shape = (before.shape[0], after.shape[0])
+        is_break = np.zeros(shape, dtype=bool)
+        count = np.zeros(shape, dtype=np.int16)
+        for column in range(before.shape[1]):
+            before_nan = (before[:, column] == self.NAN_CODE)[:, None]
+            after_nan = (after[:, column] == self.NAN_CODE)[None, :]
+            same = (before[:, column][:, None] == after[:, column][None, :]) & ~before_nan
+            is_valid = same | (before_nan & after_nan)
+            count += same
+            if self.is_nan:
+                is_valid |= before_nan ^ after_nan
+                count += before_nan & ~after_nan
+            is_break |= ~is_valid
+        return is_break, count
+
+    def _flexible_block(self, before: np.ndarray, after: np.ndarray) -> tuple:
+        """Evaluate flexible couples for a block of pairs.
+
+        Parameters
+        ----------
+        before : np.ndarray
+            Flexible codes of before candidates.
+        after : np.ndarray
+            Flexible codes of after candidates.
+
+        Returns
+        -------
+        tuple
+            Mask of pairs that break the rule and number of flexible pairs.
+        """
+        shape = (before.shape[0], after.shape[0])
+        is_break = np.zeros(shape, dtype=bool)
+        count = np.zeros(shape, dtype=np.int16)
+        for column in range(before.shape[1]):
+            before_nan = (before[:, column] == self.NAN_CODE)[:, None]
+            after_nan = (after[:, column] == self.NAN_CODE)[None, :]
+            equal = before[:, column][:, None] == after[:, column][None, :]
+            changed = ~equal & ~before_nan & ~after_nan
+            is_valid = changed | (before_nan & after_nan)
+            count += changed
+            if not self.is_strict_flexible:
+                is_valid |= equal & ~before_nan
+            elif self.is_nan:
+                is_valid |= before_nan ^ after_nan
+                count += before_nan & ~after_nan
+            is_break |= ~is_valid
+        return is_break, count
+
+    def find_pairs(self,
+                   stable_columns: pd.DataFrame,
+                   flexible_columns: pd.DataFrame,
+                   decision_column: pd.DataFrame,
+                   before_indexes: np.ndarray,
+                   after_indexes: np.ndarray,
+                   pair_filter: tuple = None) -> list:
+        """Find all pairs of classification rules that can make an action rule.
+
+        Parameters
+        ----------
+        stable_columns : pd.DataFrame
+            Data frame with stable attributes.
+        flexible_columns : pd.DataFrame
+            Data frame with flexible attributes.
+        decision_column : pd.DataFrame
+            Data frame with consequent.
+        before_indexes : np.ndarray
+            Indexes that can be used in the before part.
+        after_indexes : np.ndarray
+            Indexes that can be used in the after part.
+        pair_filter : tuple = None
+            Groups of before indexes, groups of after indexes and boolean matrix of allowed (before, after) groups.
+            If it is entered, it replaces the check of already used pairs.
+
+        Returns
+        -------
+        list
+            Pairs (rule_before_index, rule_after_index) in the order of itertools.product.
+        """
+        pairs = []
+        if len(before_indexes) == 0 or len(after_indexes) == 0:
+            return pairs
+        stable_codes = self._get_cached("stable", stable_columns, self._encode)
+        flexible_codes = self._get_cached("flexible", flexible_columns, self._encode)
+        decision_codes, allowed = self._get_cached("decision", decision_column, self._get_allowed_decisions)
+        before_positions = decision_column.index.get_indexer(before_indexes)
+        after_positions = decision_column.index.get_indexer(after_indexes)
+        is_used_check = self.is_nan and pair_filter is None
+        if is_used_check:
+            if self._pair_keys is None:
+                self.set_pair_keys(decision_column.index)
+            before_keys = self._pair_keys.get_indexer(before_indexes).astype(np.int64)
+            after_keys = self._pair_keys.get_indexer(after_indexes).astype(np.int64)
+        rows_in_block = max(1, self.block_size // len(after_positions))
+        for start in range(0, len(before_positions), rows_in_block):
+            block = before_positions[start:start + rows_in_block]
+            is_valid = allowed[decision_codes[block][:, None], decision_codes[after_positions][None, :]]
+            if pair_filter is not None:
+                before_groups, after_groups, new_pairs = pair_filter
+                is_valid &= new_pairs[before_groups[start:start + rows_in_block][:, None], after_groups[None, :]]
+            if is_used_check:
+                keys = before_keys[start:start + rows_in_block][:, None] * len(self._pair_keys) + after_keys[None, :]
+                is_valid &= ~np.isin(keys, self.used_pairs)
+                self.used_pairs = np.union1d(self.used_pairs, keys.ravel())
+            stable_break, stable_count = self._stable_block(stable_codes[block], stable_codes[after_positions])
+            is_valid &= ~stable_break
+            flexible_break, flexible_count = self._flexible_block(flexible_codes[block],
+                                                                  flexible_codes[after_positions])
+            is_valid &= ~flexible_break
+            is_valid &= (stable_count >= self.min_stable_antecedents) & \
+                        (stable_count <= self.max_stable_antecedents) & \
+                        (flexible_count >= self.min_flexible_antecedents) & \
+                        (flexible_count <= self.max_flexible_antecedents)
+            block_before, block_after = np.nonzero(is_valid)
+            for position_before, position_after in zip(block_before, block_after):
+                pairs.append((before_indexes[start + position_before], after_indexes[position_after]))
+        return pairs
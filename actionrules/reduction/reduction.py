@@ -9,28 +9,41 @@ class Reduction:
     The class Reduction creates the Reduction tree that speed up the discovery process.
     This feature can be skipped. In this case, the Reduction class is not initialized.
 
+    The tables are not copied. There is one base table, its rows are divided into disjoint segments
+    (arrays of row positions) and every reduction table (partition) is a list of segments. Without uncertainty
+    every partition has its own segment. With uncertainty the rows with missing stable value are kept in
+    one shared segment that is referenced by all sibling partitions instead of being copied into each of them.
+
     ...
 
     Attributes
     ----------
-    stable_tables : List[pd.DataFrame]
-        List of data frames with stable attributes.
-    flexible_tables : List[pd.DataFrame]
-        List of data frames with flexible attributes.
-    decision_tables : List[pd.DataFrame]
-        List of data frames with consequent.
+    stable_columns : pd.DataFrame
+        Data frame with stable attributes.
+    flexible_columns : pd.DataFrame
+        Data frame with flexible attributes.
+    decision_column : pd.DataFrame
+        Data frame with consequent.
+    segments : List[np.ndarray]
+        Disjoint arrays of row positions in the base table.
+    partitions : List[List[int]]
+        Reduction tables, every table is a list of positions in segments.
     stable_columns_count : int
         Count of stable attributes.
     flexible_columns_count : int
         Count of flexible attributes.
     desired_state : DesiredState
         DesiredState object.
-    self.supp : List[pd.Series]
-        List of Pandas Series with support.
-    self.conf : List[pd.Series]
-        List of Pandas Series with confidence.
-    self.is_nan : bool
+    supp : pd.Series
+        Pandas Series with support.
+    conf : pd.Series
+        Pandas Series with confidence.
+    is_nan : bool
         Should uncertainty be used?
+    util_flex : pd.Series or None
+        Pandas Series with utilities of flexible attributes.
+    util_target : pd.Series or None
+        Pandas Series with utilities of consequent.
 
     Methods
     -------
@@ -60,21 +73,23 @@ class Reduction:
         is_nan: bool
             Should uncertainty be used?
         """
-        self.stable_tables = [stable_columns]
-        self.flexible_tables = [flexible_columns]
-        self.decision_tables = [decision_column]
+        self.stable_columns = stable_columns
+        self.flexible_columns = flexible_columns
+        self.decision_column = decision_column
+        self.segments = [np.arange(len(decision_column.index))]
+        self.partitions = [[0]]
         self.stable_columns_count = self._get_columns_count(stable_columns)
         self.flexible_columns_count = self._get_columns_count(flexible_columns)
         self.desired_state = desired_state
-        self.supp = [pd.Series(supp)]
-        self.conf = [pd.Series(conf)]
+        self.supp = pd.Series(supp)
+        self.conf = pd.Series(conf)
         self.is_nan = is_nan
         self.util_flex = None
         if util_flex:
-            self.util_flex = [pd.Series(util_flex)]
+            self.util_flex = pd.Series(util_flex)
         self.util_target = None
         if util_target:
-            self.util_target = [pd.Series(util_target)]
+            self.util_target = pd.Series(util_target)
 
     @staticmethod
     def _get_columns_count(columns: pd.DataFrame) -> int:
@@ -92,105 +107,125 @@ class Reduction:
         """
         return len(columns.columns)
 
+    def _get_stable_codes(self, split_position: int) -> np.ndarray:
+        """Get codes of a stable column, NaN values have code -1.
+
+        Parameters
+        ----------
+        split_position : int
+            Position of the stable column.
+
+        Returns
+        -------
+        np.ndarray
+            Codes of all rows in the base table.
+        """
+        codes, uniques = pd.factorize(self.stable_columns.iloc[:, split_position])
+        nan_codes = np.flatnonzero(pd.Index(uniques).astype(str) == 'nan')
+        codes[np.isin(codes, nan_codes)] = -1
+        return codes
+
+    def _get_decision_codes(self) -> tuple:
+        """Get codes of the consequent.
+
+        Returns
+        -------
+        tuple
+            Codes of all rows in the base table and unique values.
+        """
+        return pd.factorize(self.decision_column.iloc[:, 0], use_na_sentinel=False)
+
     @staticmethod
-    def _get_unique_values(table: pd.DataFrame, column_number: int) -> list:
-        """Get unique values from column
+    def _split_segment(segment: np.ndarray, codes: np.ndarray) -> dict:
+        """Split one segment by stable column.
+
+        Parameters
+        ----------
+        segment : np.ndarray
+            Row positions of the segment.
+        codes : np.ndarray
+            Codes of the stable column (all rows in the base table).
+
+        Returns
+        -------
+        dict
+            Code -> (first row position, row positions with this code).
+        """
+        segment_codes = codes[segment]
+        unique_codes, first_positions, inverse = np.unique(segment_codes, return_index=True, return_inverse=True)
+        order = np.argsort(inverse.reshape(-1), kind="stable")
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(inverse.reshape(-1), minlength=len(unique_codes)))))
+        groups = {}
+        for group, code in enumerate(unique_codes):
+            groups[int(code)] = (segment[first_positions[group]], segment[order[bounds[group]:bounds[group + 1]]])
+        return groups
+
+    def _is_candidate(self, segment_ids: list, segment_decisions: list, decision_uniques: pd.Index) -> bool:
+        """Check if the reduction table made of segments can create action rules.
 
         Parameters
         ----------
-        table : pd.DataFrame
-            Data frame with consequent values.
-        column_number : int
-            Column number to be checked.
+        segment_ids : list
+            Positions of segments.
+        segment_decisions : list
+            Unique codes of consequent in every segment.
+        decision_uniques : pd.Index
+            Values of consequent codes.
 
         Returns
         -------
-        list
-            All unique values.
+        bool
+            True if the reduction table is candidate for action rules.
         """
-        return table.iloc[:, column_number].unique()
+        codes = np.unique(np.concatenate([segment_decisions[segment_id] for segment_id in segment_ids]))
+        target = self.decision_column.columns[0]
+        return self.desired_state.is_candidate(pd.DataFrame({target: decision_uniques[codes]}))
+
+    def _split_partitions_by_stable(self, codes: np.ndarray):
+        """Split all reduction tables by one stable column.
 
-    def _split_tables_by_stable(self, stable_columns: pd.DataFrame, flexible_columns: pd.DataFrame,
-                                decision_column: pd.DataFrame,
-                                split_position: int, supp_series: pd.Series, conf_series: pd.Series,
-                                util_flex_series: pd.Series = None, util_target_series: pd.Series = None):
-        """Split table by stable column.
+        Every segment is split just once, so the segments shared by many partitions stay shared.
+        The new partitions are in the order of the first appearance of their value in the parent.
 
         Parameters
         ----------
-        stable_columns : pd.DataFrame
-            Stable attributes.
-        flexible_columns : pd.DataFrame
-            Flexible attributes.
-        decision_column : pd.DataFrame
-            Consequent column.
-        split_position : int
-            The position where the split can be made.
-        supp_series : pd.Series
-            Support column.
-        conf_series : pd.Series
-            Confidence column.
+        codes : np.ndarray
+            Codes of the stable column (all rows in the base table).
         """
-        unique_values = self._get_unique_values(stable_columns, split_position)
-        for unique_value in unique_values:
-            if self.is_nan:
-                mask = np.logical_or(stable_columns.iloc[:, split_position] == unique_value,
-                                     np.logical_or(stable_columns.iloc[:, split_position].isnull(),
-                                                   stable_columns.iloc[:, split_position] == 'nan'
-                                                   )
-                                     )
-            else:
-                if str(unique_value).lower() == "nan":
-                    mask = np.logical_or(stable_columns.iloc[:, split_position].isnull(),
-                                         stable_columns.iloc[:, split_position] == 'nan'
-                                         )
-                else:
-                    mask = stable_columns.iloc[:, split_position] == unique_value
-            new_stable_table = stable_columns[mask]
-            new_flexible_table = flexible_columns[mask]
-            new_decision_table = decision_column[mask]
-            new_supp_series = supp_series[mask]
-            new_conf_series = conf_series[mask]
-            new_util_flex_series = None
-            if util_flex_series is not None:
-                new_util_flex_series = util_flex_series[mask]
-            new_util_target_series = None
-            if util_target_series is not None:
-                new_util_target_series = util_target_series[mask]
-            if self.desired_state.is_candidate(new_decision_table):
-                self.stable_tables.append(new_stable_table)
-                self.flexible_tables.append(new_flexible_table)
-                self.decision_tables.append(new_decision_table)
-                self.supp.append(new_supp_series)
-                self.conf.append(new_conf_series)
-                if new_util_flex_series is not None:
-                    self.util_flex.append(new_util_flex_series)
-                if new_util_target_series is not None:
-                    self.util_target.append(new_util_target_series)
+        decision_codes, decision_uniques = self._get_decision_codes()
+        decision_uniques = pd.Index(decision_uniques)
+        splits = [self._split_segment(segment, codes) for segment in self.segments]
+        new_segments = []
+        segment_ids = []
+        for groups in splits:
+            ids = {}
+            for code, (_, rows) in groups.items():
+                ids[code] = len(new_segments)
+                new_segments.append(rows)
+            segment_ids.append(ids)
+        segment_decisions = [np.unique(decision_codes[segment]) for segment in new_segments]
+        new_partitions = []
+        for partition in self.partitions:
+            first_positions = {}
+            for segment_id in partition:
+                for code, (first_position, _) in splits[segment_id].items():
+                    first_positions[code] = min(first_position, first_positions.get(code, first_position))
+            nan_ids = [segment_ids[segment_id][-1] for segment_id in partition if -1 in segment_ids[segment_id]]
+            for code in sorted(first_positions, key=first_positions.get):
+                new_partition = [segment_ids[segment_id][code] for segment_id in partition
+                                 if code in segment_ids[segment_id]]
+                if self.is_nan and code != -1:
+                    new_partition.extend(nan_ids)
+                if self._is_candidate(new_partition, segment_decisions, decision_uniques):
+                    new_partitions.append(new_partition)
+        used = sorted({segment_id for partition in new_partitions for segment_id in partition})
+        renumber = {segment_id: position for position, segment_id in enumerate(used)}
+        self.segments = [new_segments[segment_id] for segment_id in used]
+        self.partitions = [[renumber[segment_id] for segment_id in partition] for partition in new_partitions]
 
     def reduce(self):
         """Reduce Decision table to many reduction tables.
 
         """
         for split_position in range(self.stable_columns_count):
-            for table in range(len(self.stable_tables)):
-                stable_columns = self.stable_tables.pop(0)
-                flexible_columns = self.flexible_tables.pop(0)
-                decision_column = self.decision_tables.pop(0)
-                supp_series = self.supp.pop(0)
-                conf_series = self.conf.pop(0)
-                util_flex_series = None
-                if self.util_flex:
-                    util_flex_series = self.util_flex.pop(0)
-                util_target_series = None
-                if self.util_target:
-                    util_target_series = self.util_target.pop(0)
-                self._split_tables_by_stable(stable_columns,
-                                             flexible_columns,
-                                             decision_column,
-                                             split_position,
-                                             supp_series,
-                                             conf_series,
-                                             util_flex_series,
-                                             util_target_series
-                                             )
+            self._split_partitions_by_stable(self._get_stable_codes(split_position))
@@ -0,0 +1 @@
+from .ruleIndex import *
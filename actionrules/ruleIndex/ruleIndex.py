@@ -0,0 +1,118 @@
+import pandas as pd
+import numpy as np
+
+from actionrules.encoding import Encoding
+
+
+class RuleIndex:
+    """
+    The class RuleIndex is a compiled scoring index of rules. The rules are grouped by the set of columns
+    used in their conditions. Every group is a hash table from the codes of the condition values to the rules,
+    so a whole batch of rows is matched to all rules of a group by one lookup instead of one scan of the batch
+    for every rule.
+
+    ...
+
+    Attributes
+    ----------
+    encoding : Encoding
+        Dictionary encoding of values.
+    rules_count : int
+        Number of rules in the index.
+    groups : list
+        Groups of rules with the same condition columns - (columns, unique codes of conditions,
+        starts of conditions in rule ids, rule ids ordered by conditions).
+
+    Methods
+    -------
+    match(self, source_table: pd.DataFrame) -> tuple
+        Find all pairs of rows and rules whose conditions the rows satisfy.
+    """
+
+    def __init__(self, conditions: pd.DataFrame, encoding: Encoding):
+        """Initialise.
+
+        Parameters
+        ----------
+        conditions : pd.DataFrame
+            Condition values of rules (rules x columns), NaN value means no condition.
+            The position of the rule in the data frame is its id.
+        encoding : Encoding
+            Dictionary encoding of values.
+        """
+        self.encoding = encoding
+        self.rules_count = len(conditions.index)
+        self.groups = []
+        if self.rules_count == 0:
+            return
+        columns = list(conditions.columns)
+        codes = np.empty((self.rules_count, len(columns)), dtype=np.int64)
+        for position, column in enumerate(columns):
+            codes[:, position] = encoding.get_codes(column, conditions[column])
+        is_condition = codes != Encoding.NAN_CODE
+        patterns, rule_patterns = np.unique(is_condition, axis=0, return_inverse=True)
+        rule_patterns = rule_patterns.reshape(-1)
+        for pattern_position, pattern in enumerate(patterns):
+            rule_ids = np.flatnonzero(rule_patterns == pattern_position)
+            group_columns = [column for column, is_used in zip(columns, pattern) if is_used]
+            key_ids, keys = pd.factorize(self._get_keys(codes[np.ix_(rule_ids, np.flatnonzero(pattern))]))
+            order = np.argsort(key_ids, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(np.bincount(key_ids, minlength=len(keys)))))
+            self.groups.append((group_columns, keys, starts, rule_ids[order]))
+
+    @staticmethod
+    def _get_keys(codes: np.ndarray) -> pd.Index:
+        """Get keys of rows made of their codes.
+
+        Parameters
+        ----------
+        codes : np.ndarray
+            Codes (rows x columns).
+
+        Returns
+        -------
+        pd.Index
+            Keys (MultiIndex if there are more columns).
+        """
+        if codes.shape[1] == 0:
+            return pd.Index(np.zeros(codes.shape[0], dtype=np.int64))
+        if codes.shape[1] == 1:
+            return pd.Index(codes[:, 0])
+        return pd.MultiIndex.from_arrays(list(codes.T))
+
+    def match(self, source_table: pd.DataFrame) -> tuple:
+        """Find all pairs of rows and rules whose conditions the rows satisfy.
+
+        Parameters
+        ----------
+        source_table : pd.DataFrame
+            Data frame with rows to match (values converted to strings or categorical).
+
+        Returns
+        -------
+        tuple
+            Row positions and rule ids of pairs, ordered by rule id and row position.
+        """
+        row_positions = []
+        rule_ids = []
+        source_codes = {}
+        for columns, keys, starts, group_rule_ids in self.groups:
+            codes = np.empty((len(source_table.index), len(columns)), dtype=np.int64)
+            for position, column in enumerate(columns):
+                if column not in source_codes:
+                    source_codes[column] = self.encoding.get_codes(column, source_table[column])
+                codes[:, position] = source_codes[column]
+            key_positions = keys.get_indexer(self._get_keys(codes))
+            rows = np.flatnonzero(key_positions >= 0)
+            key_positions = key_positions[rows]
+            # Every found row is paired with all rules of its key
+            counts = starts[key_positions + 1] - starts[key_positions]
+            offsets = np.repeat(starts[key_positions] - np.cumsum(counts) + counts, counts)
+            row_positions.append(np.repeat(rows, counts))
+            rule_ids.append(group_rule_ids[offsets + np.arange(len(offsets))])
+        if not row_positions:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        row_positions = np.concatenate(row_positions)
+        rule_ids = np.concatenate(rule_ids)
+        order = np.lexsort((row_positions, rule_ids))
+        return row_positions[order], rule_ids[order]
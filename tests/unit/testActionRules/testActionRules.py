@@ -1,8 +1,10 @@
+import itertools
 import unittest
 import pandas as pd
 
 from actionrules.actionRules import ActionRules
 from actionrules.desiredState import DesiredState
+from actionrules.decisions import Decisions
 
 
 class TestActionRules(unittest.TestCase):
@@ -11,12 +13,14 @@ class TestActionRules(unittest.TestCase):
                                                            [pd.DataFrame()],
                                                            [pd.DataFrame()],
                                                            DesiredState(),
+                                                           Decisions(),
                                                            [pd.Series()],
                                                            [pd.Series()])
         self.actionRulesDiscoveryEmptyNan = ActionRules([pd.DataFrame()],
                                                         [pd.DataFrame()],
                                                         [pd.DataFrame()],
                                                         DesiredState(),
+                                                        Decisions(),
                                                         [pd.Series()],
                                                         [pd.Series()],
                                                         True)
@@ -98,5 +102,110 @@ class TestActionRules(unittest.TestCase):
         expected = 0.15
         self.assertAlmostEqual(expected, result)
 
+    def test_balance_jobs(self):
+        result = ActionRules._balance_jobs(['a', 'b', 'c', 'd'], [10, 1, 8, 3], 2)
+        # the most expensive job goes to the cheapest chunk, jobs in a chunk keep their order
+        expected = [['a', 'b'], ['c', 'd']]
+        self.assertEqual(expected, result)
+
+    def test_push_ranked(self):
+        action_rules = ActionRules([pd.DataFrame()], [pd.DataFrame()], [pd.DataFrame()], DesiredState(), Decisions(),
+                                   [pd.Series()], [pd.Series()], top_k=2, rank_by="uplift")
+        heap = []
+        for order, uplift in enumerate([0.1, 0.3, 0.2, 0.2]):
+            action_rule = [[[], [], []], [], [], uplift, None, None]
+            action_rules._push_ranked(heap, order, (action_rule, order, order))
+        # the same value found later does not replace the earlier one
+        result = [item[:2] for item in sorted(heap, reverse=True)]
+        expected = [(0.3, -1), (0.2, -2)]
+        self.assertEqual(expected, result)
+        self.assertEqual(0.2, action_rules._rank_threshold)
+
+    def test_get_rank_value(self):
+        action_rule = [[[], [], []], [0.1, 0.2, 0.1], [0.5, 0.9, 0.45], 0.3, None, float("nan")]
+        result = [ActionRules.get_rank_value(action_rule, rank_by) for rank_by in ActionRules.RANK_BY]
+        # missing values are ranked last
+        expected = [0.3, 0.45, 0.1, float("-inf"), float("-inf")]
+        self.assertEqual(expected, result)
+
+    def test_get_signatures_when_not_nan(self):
+        stable = pd.DataFrame({'a': ['1', 'nan', '1']})
+        flexible = pd.DataFrame({'b': ['1', '2', 'nan']})
+        signatures, compatible, _ = self.actionRulesDiscoveryEmptyNotNan._get_signatures(stable, flexible)
+        # just the rows with the same null pattern and at least one stable and flexible attribute
+        result = compatible[signatures[:, None], signatures[None, :]].tolist()
+        expected = [[True, False, False], [False, False, False], [False, False, False]]
+        self.assertEqual(expected, result)
+
+    def _get_valid_pairs(self, action_rules: ActionRules, stable: pd.DataFrame, flexible: pd.DataFrame,
+                         decision: pd.DataFrame, pairs: list) -> list:
+        # the pairs that pass the pair by pair checks of all pairs
+        valid_pairs = []
+        for rule_before_index, rule_after_index in pairs:
+            if not action_rules.desired_state.is_candidate_decision(decision.at[rule_before_index, 'd'],
+                                                                   decision.at[rule_after_index, 'd']):
+                continue
+            is_all_stable, _, counted_stable = action_rules._create_action_rules(
+                stable, rule_before_index, rule_after_index, "stable")
+            is_all_flexible, _, counted_flexible = action_rules._create_action_rules(
+                flexible, rule_before_index, rule_after_index, "flexible")
+            if is_all_stable and is_all_flexible and \
+                    action_rules.min_stable_antecedents <= counted_stable <= action_rules.max_stable_antecedents and \
+                    action_rules.min_flexible_antecedents <= counted_flexible <= \
+                    action_rules.max_flexible_antecedents:
+                valid_pairs.append((rule_before_index, rule_after_index))
+        return valid_pairs
+
+    def _get_brute_force_candidates(self, action_rules: ActionRules, stable: pd.DataFrame, flexible: pd.DataFrame,
+                                    decision: pd.DataFrame, pairs: list) -> list:
+        # allowed change of consequent, compatible null patterns and (strict) no shared flexible value
+        candidates = []
+        for before, after in pairs:
+            if not action_rules.desired_state.is_candidate_decision(decision.at[before, 'd'], decision.at[after, 'd']):
+                continue
+            stable_before, stable_after = stable.loc[before] != 'nan', stable.loc[after] != 'nan'
+            flexible_before, flexible_after = flexible.loc[before] != 'nan', flexible.loc[after] != 'nan'
+            if not action_rules.is_nan and (stable_before != stable_after).any():
+                continue
+            if not (action_rules.is_nan and action_rules.is_strict_flexible) and \
+                    (flexible_before != flexible_after).any():
+                continue
+            if not action_rules.min_stable_antecedents <= stable_after.sum() <= action_rules.max_stable_antecedents:
+                continue
+            if flexible_after.sum() < action_rules.min_flexible_antecedents:
+                continue
+            if action_rules.is_strict_flexible:
+                if flexible_after.sum() > action_rules.max_flexible_antecedents:
+                    continue
+                if (flexible_before & (flexible.loc[before] == flexible.loc[after])).any():
+                    continue
+            candidates.append((before, after))
+        return candidates
+
+    def test_get_candidates_when_compared_to_all_pairs(self):
+        stable = pd.DataFrame({'a': ['1', '1', 'nan', '2', '1', 'nan', '1', 'nan'],
+                               'b': ['x', 'nan', 'x', 'x', 'x', 'y', 'x', 'x']})
+        flexible = pd.DataFrame({'c': ['p', 'q', 'q', 'nan', 'r', 'p', 'q', 'r'],
+                                 'e': ['u', 'v', 'nan', 'v', 'u', 'v', 'v', 'v']})
+        decision = pd.DataFrame({'d': ['no', 'yes', 'no', 'yes', 'yes', 'no', 'yes', 'no']})
+        for is_nan, is_strict_flexible in itertools.product([False, True], [False, True]):
+            action_rules = ActionRules([stable], [flexible], [decision], DesiredState(desired_classes=['yes']),
+                                       Decisions(), [pd.Series([1] * 8)], [pd.Series([1] * 8)], is_nan,
+                                       max_stable_antecedents=2, max_flexible_antecedents=2,
+                                       is_strict_flexible=is_strict_flexible)
+            before_indexes, after_indexes = action_rules._split_to_before_after_consequent(decision)
+            all_pairs = list(itertools.product(before_indexes.tolist(), after_indexes.tolist()))
+            candidates = [(int(before), int(after)) for before, after in action_rules._get_candidates(
+                stable, flexible, decision, before_indexes, after_indexes)]
+            # the candidates are in the order of all pairs
+            self.assertEqual(self._get_brute_force_candidates(action_rules, stable, flexible, decision, all_pairs),
+                             candidates, (is_nan, is_strict_flexible))
+            # just the pairs that cannot make action rules are skipped
+            expected = self._get_valid_pairs(action_rules, stable, flexible, decision, all_pairs)
+            result = self._get_valid_pairs(action_rules, stable, flexible, decision, candidates)
+            self.assertEqual(expected, result, (is_nan, is_strict_flexible))
+            # pairs with incompatible null patterns are not candidates
+            self.assertLess(len(candidates), len(all_pairs))
+
 if __name__ == '__main__':
     unittest.main()
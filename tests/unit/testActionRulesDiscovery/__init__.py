@@ -0,0 +1 @@
+from .testActionRulesDiscovery import TestActionRulesDiscovery
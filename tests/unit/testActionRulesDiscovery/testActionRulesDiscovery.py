@@ -0,0 +1,211 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+
+from actionrules.actionRules import ActionRules
+from actionrules.actionRulesDiscovery import ActionRulesDiscovery
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'notebooks', 'data', 'titanic.csv')
+
+try:
+    import pyarrow
+    IS_PYARROW = True
+except ImportError:
+    IS_PYARROW = False
+
+
+class TestActionRulesDiscovery(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.read_csv(DATA_FILE, sep=';')
+
+    def _fit(self, **kwargs):
+        parameters = dict(stable_attributes=['Sex', 'Age'],
+                          flexible_attributes=['Embarked', 'Fare', 'Pclass'],
+                          consequent='Survived',
+                          conf=55,
+                          supp=3,
+                          desired_classes=['1.0'])
+        parameters.update(kwargs)
+        action_rules_discovery = ActionRulesDiscovery()
+        action_rules_discovery.load_pandas(self.data)
+        action_rules_discovery.fit(**parameters)
+        return action_rules_discovery
+
+    def _get_top_k(self, action_rules: list, k: int, rank_by: str) -> list:
+        # stable sort, from the same values the earlier found action rule is better
+        return sorted(action_rules, key=lambda action_rule: -ActionRules.get_rank_value(action_rule, rank_by))[:k]
+
+    def _sort_by_row(self, predicted_table: pd.DataFrame) -> pd.DataFrame:
+        # chunks are ordered by row, predict by action rule
+        predicted_table = predicted_table.reset_index()
+        return predicted_table.sort_values(['index', ActionRulesDiscovery.ACTION_RULE]).reset_index(drop=True)
+
+    def test_fit_when_no_classification_rules(self):
+        action_rules_discovery = ActionRulesDiscovery()
+        action_rules_discovery.load_pandas(self.data)
+        # desired classes are not in data (values are '3.0' and '1.0'), so no classification rules are mined
+        action_rules_discovery.fit(stable_attributes=['Sex', 'Age'],
+                                   flexible_attributes=['Embarked', 'Fare'],
+                                   consequent='Pclass',
+                                   conf=55,
+                                   supp=3,
+                                   desired_changes=[['3', '1']])
+        self.assertEqual([], action_rules_discovery.get_action_rules())
+        self.assertEqual(0, len(action_rules_discovery.predict(self.data).index))
+
+    def test_fit_when_n_jobs(self):
+        for parameters in [dict(), dict(is_nan=True), dict(top_k=5)]:
+            expected = self._fit(**parameters).action_rules
+            result = self._fit(n_jobs=2, **parameters).action_rules
+            # the same action rules in the same order as from one process
+            self.assertGreater(len(expected.action_rules), 0)
+            self.assertEqual(expected.action_rules, result.action_rules, parameters)
+            self.assertEqual(expected.classification_before, result.classification_before, parameters)
+            self.assertEqual(expected.classification_after, result.classification_after, parameters)
+
+    def test_top_k_with_n_jobs_when_ranks_are_tied(self):
+        # many action rules have the same support
+        expected = self._get_top_k(self._fit(supp=1, is_strict_flexible=False).get_action_rules(), 3, "support")
+        result = self._fit(supp=1, is_strict_flexible=False, top_k=3, rank_by="support", n_jobs=2).get_action_rules()
+        self.assertEqual(expected, result)
+
+    def test_top_k_when_ranked_by(self):
+        all_action_rules = self._fit(supp=1, is_strict_flexible=False).get_action_rules()
+        for rank_by in ["uplift", "confidence", "support"]:
+            expected = self._get_top_k(all_action_rules, 5, rank_by)
+            result = self._fit(supp=1, is_strict_flexible=False, top_k=5, rank_by=rank_by).get_action_rules()
+            self.assertEqual(expected, result, rank_by)
+
+    def test_top_k_when_ranked_by_utility_without_utility_table(self):
+        for rank_by, parameters in [("util_dif", dict(min_util_dif=0.0)), ("profit", dict(min_profit=0.0))]:
+            all_action_rules = self._fit(supp=1, is_strict_flexible=False, **parameters).get_action_rules()
+            # no action rule has the value, the first found action rules are the best
+            expected = self._get_top_k(all_action_rules, 3, rank_by)
+            result = self._fit(supp=1, is_strict_flexible=False, top_k=3, rank_by=rank_by,
+                               **parameters).get_action_rules()
+            self.assertEqual(expected, result, rank_by)
+
+    def test_fit_partitions_when_called_again(self):
+        action_rules = self._fit(supp=1, is_strict_flexible=False, top_k=3, rank_by="support",
+                                 is_lazy=True).action_rules
+        jobs = [(position, partition, None) for position, partition in enumerate(action_rules.partitions)]
+        middle = len(jobs) // 2
+        expected = action_rules._fit_partitions(jobs[:middle])
+        # the threshold of the previous chunk must not prune the next chunk (its tied rules are found earlier)
+        action_rules._fit_partitions(jobs[middle:])
+        result = action_rules._fit_partitions(jobs[:middle])
+        self.assertEqual(expected, result)
+
+    def test_fit_when_numpy_miner_and_nan(self):
+        expected = self._fit(is_nan=True).get_action_rules()
+        action_rules_discovery = self._fit(is_nan=True, miner="numpy")
+        # the supports are counted from the data, the transactions for PyFIM are not built
+        self.assertIsNone(action_rules_discovery.decisions._transactions)
+        self.assertEqual(sorted(map(repr, expected)), sorted(map(repr, action_rules_discovery.get_action_rules())))
+
+    def test_predict_dtypes(self):
+        action_rules_discovery = self._fit()
+        # some action rules match no row of the head
+        result = action_rules_discovery.predict(self.data.head(7)).dtypes
+        self.assertEqual('int64', result[ActionRulesDiscovery.ACTION_RULE])
+        self.assertEqual('object', result[ActionRulesDiscovery.ACTION_RULE_TARGET])
+        self.assertEqual('object', result['Fare-recommended'])
+        self.assertEqual('object', result['Age'])
+        for column in ActionRulesDiscovery.PREDICT_METRICS[1:]:
+            self.assertEqual('float64', result[column])
+
+    def test_iter_action_rules_when_lazy(self):
+        expected = self._fit(is_nan=True).get_action_rules()
+        action_rules_discovery = self._fit(is_nan=True, is_lazy=True)
+        first = list(action_rules_discovery.iter_action_rules(5))
+        # the next call continues the search, get_action_rules finishes it
+        second = list(action_rules_discovery.iter_action_rules(10))
+        self.assertEqual(expected[:5], first)
+        self.assertEqual(expected[:10], second)
+        self.assertEqual(expected, action_rules_discovery.get_action_rules())
+        self.assertEqual(expected, list(action_rules_discovery.iter_action_rules()))
+
+    def test_iter_action_rules_when_not_stored(self):
+        expected = self._fit(is_nan=True).get_action_rules()
+        action_rules_discovery = self._fit(is_nan=True, is_lazy=True)
+        result = list(action_rules_discovery.iter_action_rules(is_stored=False))
+        self.assertEqual(expected, result)
+        # nothing is kept, so the search cannot be finished for other methods
+        action_rules = action_rules_discovery.action_rules
+        self.assertEqual([], action_rules.action_rules)
+        self.assertEqual([], action_rules.classification_before)
+        self.assertEqual([], action_rules.classification_after)
+        with self.assertRaises(Exception):
+            action_rules_discovery.get_action_rules()
+        with self.assertRaises(Exception):
+            list(action_rules_discovery.iter_action_rules())
+
+    def test_predict_csv_when_chunks_are_smaller(self):
+        action_rules_discovery = self._fit()
+        expected = action_rules_discovery.predict(self.data)
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'titanic.csv')
+            self.data.to_csv(file, sep=';', index=False)
+            # the last chunk is not full
+            result = pd.concat(action_rules_discovery.predict_csv(file, chunksize=100, sep=';'))
+        self.assertEqual(list(expected.columns), list(result.columns))
+        pd.testing.assert_frame_equal(self._sort_by_row(expected), self._sort_by_row(result))
+
+    @unittest.skipIf(not IS_PYARROW, "Parquet files need the package pyarrow")
+    def test_predict_parquet_when_batches_are_smaller(self):
+        action_rules_discovery = self._fit()
+        expected = action_rules_discovery.predict(self.data)
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'titanic.parquet')
+            self.data.to_parquet(file, index=False)
+            result = pd.concat(action_rules_discovery.predict_parquet(file, batch_size=100))
+        self.assertEqual(list(expected.columns), list(result.columns))
+        pd.testing.assert_frame_equal(self._sort_by_row(expected), self._sort_by_row(result))
+
+    def test_predict_chunks_when_chunk_is_empty(self):
+        action_rules_discovery = self._fit()
+        expected = list(action_rules_discovery.predict(self.data).columns)
+        result = list(action_rules_discovery.predict_chunks([self.data.head(0), self.data.head(7)]))
+        # an empty chunk has the same columns as other chunks
+        self.assertEqual(0, len(result[0].index))
+        self.assertEqual(expected, list(result[0].columns))
+        self.assertEqual(expected, list(result[1].columns))
+
+    def test_predict_when_compact(self):
+        action_rules_discovery = self._fit()
+        expected = action_rules_discovery.predict(self.data)
+        result = action_rules_discovery.predict(self.data, is_compact=True)
+        recommended_columns = [column for column in expected.columns if column.endswith('-recommended')]
+        # one row for every match, in the same order as the wide output
+        self.assertEqual([ActionRulesDiscovery.ROW, ActionRulesDiscovery.ACTION_RULE], list(result.columns[:2]))
+        self.assertEqual(sorted(recommended_columns), sorted(result.columns[2:]))
+        self.assertEqual(list(expected.index), list(result[ActionRulesDiscovery.ROW]))
+        self.assertEqual(list(expected[ActionRulesDiscovery.ACTION_RULE]),
+                         list(result[ActionRulesDiscovery.ACTION_RULE]))
+        for column in recommended_columns:
+            self.assertTrue(expected[column].reset_index(drop=True).equals(result[column].astype(object)), column)
+
+    def test_predict_top_k_per_row_when_ranks_are_tied(self):
+        action_rules_discovery = self._fit()
+        ranks = [ActionRules.get_rank_value(action_rule, "support")
+                 for action_rule in action_rules_discovery.get_action_rules()]
+        predicted_table = action_rules_discovery.predict(self.data)
+        matches = list(zip(predicted_table.index, predicted_table[ActionRulesDiscovery.ACTION_RULE]))
+        rule_ids_of_rows = {}
+        for row, rule_id in matches:
+            rule_ids_of_rows.setdefault(row, []).append(rule_id)
+        # the best action rule of every row, the earlier action rule wins a tie
+        best_matches = set()
+        is_tied = False
+        for row, rule_ids in rule_ids_of_rows.items():
+            rule_ids = sorted(rule_ids, key=lambda rule_id: -ranks[rule_id])
+            best_matches.update((row, rule_id) for rule_id in rule_ids[:1])
+            is_tied |= len(rule_ids) > 1 and ranks[rule_ids[0]] == ranks[rule_ids[1]]
+        self.assertTrue(is_tied)
+        expected = predicted_table[[match in best_matches for match in matches]]
+        result = action_rules_discovery.predict(self.data, top_k_per_row=1, rank_by="support")
+        pd.testing.assert_frame_equal(expected, result)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+from .testBitmapIndex import TestBitmapIndex
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from actionrules.bitmapIndex import BitmapIndex
+from actionrules.encoding import Encoding
+
+
+class TestBitmapIndex(unittest.TestCase):
+    def setUp(self):
+        # 10 rows, so the last byte of bitmaps is not full
+        self.data = pd.DataFrame({'a': ['x', 'y', np.nan, 'x', 'nan', 'y', 'x', np.nan, 'x', 'y'],
+                                  'b': ['1', '1', '2', '2', '1', np.nan, '1', '2', '2', '1'],
+                                  'c': ['yes', 'no', 'yes', 'yes', 'no', 'yes', 'no', 'no', 'yes', 'yes']}).map(str)
+        self.encoding = Encoding()
+        self.encoding.fit(self.data)
+        self.bitmap_index = BitmapIndex(self.encoding.transform(self.data), self.encoding)
+
+    def _get_frequency_from_mask(self, conditions: list, decision: tuple) -> tuple:
+        # the rows are filtered by masks of strings
+        data = self.data
+        for column, value in conditions:
+            data = data[data[column] == value]
+        return len(data.index), int((data[decision[0]] == decision[1]).sum())
+
+    def test_get_frequency(self):
+        for conditions in [[], [('a', 'x')], [('a', 'x'), ('b', '2')], [('a', 'nan')], [('a', 'nan'), ('b', '2')],
+                           [('b', 'nan'), ('a', 'y')], [('a', 'z')]]:
+            expected = self._get_frequency_from_mask(conditions, ('c', 'yes'))
+            result = self.bitmap_index.get_frequency(conditions, ('c', 'yes'))
+            self.assertEqual(expected, result, conditions)
+
+    def test_cache_info(self):
+        self.bitmap_index.get_frequency([('a', 'x'), ('b', '1')], ('c', 'yes'))
+        # the same conditions in other order are the same key
+        self.bitmap_index.get_frequency([('b', '1'), ('a', 'x')], ('c', 'yes'))
+        self.bitmap_index.get_frequency([('a', 'x'), ('b', '1')], ('c', 'no'))
+        expected = {"hits": 1, "misses": 2, "size": 2, "max_size": 65536}
+        self.assertEqual(expected, self.bitmap_index.cache_info())
+
+    def test_cache_when_full(self):
+        bitmap_index = BitmapIndex(self.bitmap_index.data, self.encoding, cache_size=2)
+        bitmap_index.get_frequency([('a', 'x')], ('c', 'yes'))
+        bitmap_index.get_frequency([('a', 'y')], ('c', 'yes'))
+        bitmap_index.get_frequency([('a', 'x')], ('c', 'yes'))
+        # the least recently used frequency (a=y) is dropped
+        bitmap_index.get_frequency([('a', 'nan')], ('c', 'yes'))
+        self.assertEqual(2, bitmap_index.cache_info()["size"])
+        expected = self._get_frequency_from_mask([('a', 'x')], ('c', 'yes'))
+        self.assertEqual(expected, bitmap_index.get_frequency([('a', 'x')], ('c', 'yes')))
+        self.assertEqual((2, 3), (bitmap_index.cache_hits, bitmap_index.cache_misses))
+        bitmap_index.get_frequency([('a', 'y')], ('c', 'yes'))
+        self.assertEqual((2, 4), (bitmap_index.cache_hits, bitmap_index.cache_misses))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+from .testDecisions import TestDecisions
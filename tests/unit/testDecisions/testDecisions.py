@@ -0,0 +1,132 @@
+import unittest
+import fim
+import numpy as np
+import pandas as pd
+
+from actionrules.decisions import Decisions
+
+
+class TestDecisions(unittest.TestCase):
+    def setUp(self):
+        self.decisions = Decisions()
+        self.decisions.load_pandas(pd.DataFrame({'a': ['x', 'y', 'x', 'y'],
+                                                 'b': ['1', '1', '2', '2'],
+                                                 'c': ['yes', 'yes', 'no', 'no']}))
+        self.decisions.prepare_data_fim(['a', 'b'], 'c')
+
+    def _get_decisions(self) -> Decisions:
+        decisions = Decisions()
+        decisions.load_pandas(pd.DataFrame({'a': ['x', 'x', 'y', 'x', 'y', 'x', 'x', 'y'],
+                                            'b': ['1', '1', '1', '2', '2', '1', 'nan', '2'],
+                                            'e': ['p', 'p', 'q', 'p', 'q', 'q', 'p', 'p'],
+                                            'c': ['yes', 'yes', 'no', 'no', 'no', 'yes', 'yes', 'no']}))
+        decisions.prepare_data_fim(['a', 'b', 'e'], 'c')
+        return decisions
+
+    def _get_data_with_nan(self) -> pd.DataFrame:
+        return pd.DataFrame({'a': ['x', np.nan, 'y', 'x', 'y', 'x'],
+                             'd': [1, 2, 2, 1, 2, 2],
+                             'b': ['1', '1', 'nan', '2', '2', np.nan],
+                             'c': ['yes', 'yes', 'no', np.nan, 'no', 'yes']})
+
+    def _get_previous_transactions(self, data: pd.DataFrame, antecedent_attributes: list, consequent: str) -> tuple:
+        # transactions of strings "attribute<:> value" made row by row
+        transactions = []
+        appearance = set()
+        for _, row in data.iterrows():
+            transaction = []
+            for column, value in row.items():
+                side_type = None
+                if column == consequent:
+                    side_type = "c"
+                elif column in antecedent_attributes and str(value) != 'nan':
+                    side_type = "a"
+                if side_type:
+                    appearance.add((str(column) + "<:> " + str(value), side_type))
+                    transaction.append(str(column) + "<:> " + str(value))
+            transactions.append(transaction)
+        return transactions, appearance
+
+    def _get_previous_decision_table(self, rules: list) -> pd.DataFrame:
+        # one dictionary per rule, NaN for values "nan"
+        decisions = {}
+        for position, rule in enumerate(rules):
+            values = {}
+            for item in rule[1] + (rule[0],):
+                column, value = item.split("<:> ")
+                values[column] = np.nan if value.lower() == "nan" else value
+            decisions[position] = values
+        return pd.DataFrame(decisions).T
+
+    def test_choose_miner_when_dense(self):
+        # every transaction has 3 of 6 items
+        self.assertEqual("fpgrowth", self.decisions.choose_miner())
+
+    def test_fit_fim_apriori_same_rules_for_all_miners(self):
+        results = []
+        for miner in ["apriori", "fpgrowth", "eclat"]:
+            self.decisions.fit_fim_apriori(conf=50, support=10, miner=miner)
+            results.append(sorted((rule[0], tuple(sorted(rule[1]))) for rule in self.decisions.rules))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+
+    def test_filter_rules(self):
+        decisions = self._get_decisions()
+        decisions.fit_fim_apriori(conf=50, support=20)
+        all_rules = decisions.rules
+        for min_count, max_count in [(0, None), (1, 1), (2, None), (0, 1)]:
+            # count of antecedent items of the attributes a and b
+            expected = [rule for rule in all_rules
+                        if min_count <= sum(decisions.items[item][0] in ('a', 'b') for item in rule[1]) and
+                        (max_count is None or
+                         sum(decisions.items[item][0] in ('a', 'b') for item in rule[1]) <= max_count)]
+            decisions.rules = all_rules
+            decisions.filter_rules(['a', 'b'], min_count, max_count)
+            self.assertEqual(expected, decisions.rules, (min_count, max_count))
+
+    def test_fit_fim_apriori_when_rule_mining_mode(self):
+        decisions = self._get_decisions()
+        decisions.fit_fim_apriori(conf=50, support=20)
+        all_rules = decisions.rules
+        for rule_mining_mode, target in [("closed", "c"), ("maximal", "m"), ("generators", "g")]:
+            # item sets of the PyFIM target, the rules with other item sets are dropped
+            item_sets = {frozenset(item_set[0]) for item_set in fim.fpgrowth(decisions.transactions, target=target,
+                                                                             supp=20, zmin=2, report="")}
+            expected = sorted((rule[0], tuple(sorted(rule[1]))) for rule in all_rules
+                              if frozenset(rule[1] + (rule[0],)) in item_sets)
+            for miner in ["apriori", "fpgrowth", "eclat", "numpy"]:
+                decisions.fit_fim_apriori(conf=50, support=20, rule_mining_mode=rule_mining_mode, miner=miner)
+                result = sorted((rule[0], tuple(sorted(rule[1]))) for rule in decisions.rules)
+                self.assertEqual(expected, result, (rule_mining_mode, miner))
+                self.assertLess(len(decisions.rules), len(all_rules))
+
+    def test_prepare_data_fim_when_nan(self):
+        decisions = Decisions()
+        decisions.load_pandas(self._get_data_with_nan())
+        decisions.prepare_data_fim(['a', 'b'], 'c')
+        expected = self._get_previous_transactions(self._get_data_with_nan(), ['a', 'b'], 'c')
+        # items are ids of (attribute, value)
+        names = [str(column) + "<:> " + str(value) for column, value in decisions.items]
+        result = ([[names[item] for item in transaction] for transaction in decisions.transactions],
+                  {(names[item], side_type) for item, side_type in decisions.appearance})
+        self.assertEqual(expected, result)
+
+    def test_generate_decision_table_when_nan(self):
+        decisions = Decisions()
+        decisions.load_pandas(self._get_data_with_nan())
+        decisions.prepare_data_fim(['a', 'b'], 'c')
+        decisions.fit_fim_apriori(conf=10, support=10)
+        decisions.generate_decision_table()
+        names = [str(column) + "<:> " + str(value) for column, value in decisions.items]
+        rules = [(names[rule[0]], tuple(names[item] for item in rule[1])) + tuple(rule[2:])
+                 for rule in decisions.rules]
+        expected = self._get_previous_decision_table(rules)
+        # some rules have the consequent value "nan"
+        self.assertTrue(expected['c'].isnull().any())
+        result = decisions.decision_table
+        pd.testing.assert_frame_equal(expected, result.astype(object), check_index_type=False)
+        self.assertEqual([rule[2] for rule in rules], list(decisions.support))
+        self.assertEqual([rule[3] for rule in rules], list(decisions.confidence))
+
+if __name__ == '__main__':
+    unittest.main()
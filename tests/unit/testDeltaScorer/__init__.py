@@ -0,0 +1 @@
+from .testDeltaScorer import TestDeltaScorer
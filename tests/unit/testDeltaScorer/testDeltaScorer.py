@@ -0,0 +1,36 @@
+import unittest
+import pandas as pd
+
+from actionrules.actionRulesDiscovery import ActionRulesDiscovery
+from actionrules.deltaScorer import DeltaScorer
+
+
+class TestDeltaScorer(unittest.TestCase):
+    def setUp(self):
+        data = pd.DataFrame({'sex': ['m', 'm', 'f', 'f', 'm', 'f', 'm', 'f'],
+                             'class': ['1', '2', '1', '2', '2', '1', '1', '2'],
+                             'survived': ['1', '0', '1', '0', '0', '1', '1', '0']})
+        self.action_rules_discovery = ActionRulesDiscovery()
+        self.action_rules_discovery.load_pandas(data)
+        self.action_rules_discovery.fit(stable_attributes=['sex'],
+                                        flexible_attributes=['class'],
+                                        consequent='survived',
+                                        conf=50,
+                                        supp=1,
+                                        desired_classes=['1'])
+        self.data = data
+
+    def test_predict(self):
+        delta_scorer = DeltaScorer(self.action_rules_discovery)
+        delta_scorer.predict(self.data)
+        changed_data = self.data.copy()
+        changed_data.loc[1, 'class'] = '3'
+        changed_data.loc[8] = ['f', '2', '0']
+        result = delta_scorer.predict(changed_data)
+        expected = self.action_rules_discovery.predict(changed_data)
+        pd.testing.assert_frame_equal(expected, result)
+        # just the changed row is matched again, the new row has the same content as another row
+        self.assertEqual(1, delta_scorer.rescored_rows_count)
+
+if __name__ == '__main__':
+    unittest.main()
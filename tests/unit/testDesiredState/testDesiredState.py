@@ -28,6 +28,16 @@ class TestDesiredState(unittest.TestCase):
         expected = False
         self.assertEqual(expected, result)
 
+    def test_get_used_classes_when_change(self):
+        result = self.desiredStateDesiredChange.get_used_classes()
+        expected = ['0', '1']
+        self.assertEqual(expected, result)
+
+    def test_get_used_classes_when_class(self):
+        result = self.desiredStateDesiredClass.get_used_classes()
+        expected = None
+        self.assertEqual(expected, result)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1 @@
+from .testEncoding import TestEncoding
@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from actionrules.encoding import Encoding
+
+
+class TestEncoding(unittest.TestCase):
+    def setUp(self):
+        self.encoding = Encoding()
+        self.encoding.fit(pd.DataFrame({'a': ['x', 'nan', 'X', 'y']}))
+
+    def test_get_code(self):
+        result = [self.encoding.get_code('a', 'x'), self.encoding.get_code('a', 'nan'),
+                  self.encoding.get_code('a', 'z')]
+        expected = [0, Encoding.NAN_CODE, Encoding.UNKNOWN_CODE]
+        self.assertEqual(expected, result)
+
+    def test_get_codes_categorical(self):
+        data = self.encoding.transform(pd.DataFrame({'a': ['y', 'nan', np.nan]}))
+        result = self.encoding.get_codes('a', data['a']).tolist()
+        expected = [3, Encoding.NAN_CODE, Encoding.NAN_CODE]
+        self.assertEqual(expected, result)
+
+    def test_get_lower_codes(self):
+        result = self.encoding.get_lower_codes('a', pd.Series(['x', 'X', 'y', 'z'])).tolist()
+        self.assertEqual(result[0], result[1])
+        self.assertNotEqual(result[0], result[2])
+        self.assertEqual(Encoding.UNKNOWN_CODE, result[3])
+
+    def test_fit_keeps_codes(self):
+        self.encoding.fit(pd.DataFrame({'a': ['z', 'y']}))
+        result = [self.encoding.get_code('a', 'y'), self.encoding.get_code('a', 'z')]
+        expected = [3, 4]
+        self.assertEqual(expected, result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+from .testModelFile import TestModelFile
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+
+from actionrules.actionRulesDiscovery import ActionRulesDiscovery
+
+
+class TestModelFile(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({'sex': ['m', 'm', 'f', 'f', 'm', 'f', 'm', 'f'],
+                                  'class': ['1', '2', '1', '2', '2', '1', '1', '2'],
+                                  'survived': ['1', '0', '1', '0', '0', '1', '1', '0']})
+        self.action_rules_discovery = ActionRulesDiscovery()
+        self.action_rules_discovery.load_pandas(self.data)
+        self.action_rules_discovery.fit(stable_attributes=['sex'],
+                                        flexible_attributes=['class'],
+                                        consequent='survived',
+                                        conf=50,
+                                        supp=1,
+                                        desired_classes=['1'])
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'model.npz')
+            self.action_rules_discovery.save(file)
+            loaded = ActionRulesDiscovery()
+            loaded.load(file)
+        self.assertEqual(self.action_rules_discovery.get_action_rules(), loaded.get_action_rules())
+        pd.testing.assert_frame_equal(self.action_rules_discovery.predict(self.data), loaded.predict(self.data))
+        # training data are not saved by default
+        self.assertEqual(0, len(loaded.decisions.data.index))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+from .testNumpyMiner import TestNumpyMiner
@@ -0,0 +1,27 @@
+import unittest
+import numpy as np
+
+from actionrules.numpyMiner import NumpyMiner
+
+
+class TestNumpyMiner(unittest.TestCase):
+    def setUp(self):
+        # items 0, 1 (attribute a), 2, 3 (attribute b), 4, 5 (consequent), -1 is a missing value
+        item_matrix = np.array([[0, 2, 4],
+                                [0, 2, 4],
+                                [0, 3, 5],
+                                [1, -1, 5]])
+        self.miner = NumpyMiner(item_matrix, 2, np.array(["a", "a", "a", "a", "c", "n"]))
+
+    def test_mine(self):
+        result = sorted(self.miner.mine(supp=50, conf=60))
+        expected = [(4, (0,), 0.5, 2 / 3), (4, (0, 2), 0.5, 1.0), (4, (2,), 0.5, 1.0)]
+        self.assertEqual(expected, result)
+
+    def test_get_row_keys(self):
+        keys = NumpyMiner._get_row_keys(np.array([[0, -1], [0, -1], [1, 2], [0, 2]]))
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(3, len(np.unique(keys)))
+
+if __name__ == '__main__':
+    unittest.main()
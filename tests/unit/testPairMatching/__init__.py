@@ -0,0 +1 @@
+from .testPairMatching import TestPairMatching
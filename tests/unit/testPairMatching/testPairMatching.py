@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from actionrules.pairMatching import PairMatching
+from actionrules.desiredState import DesiredState
+
+
+class TestPairMatching(unittest.TestCase):
+    def setUp(self):
+        self.stable = pd.DataFrame({'s': ['a', 'a', np.nan, 'b']})
+        self.flexible = pd.DataFrame({'f': ['x', 'y', 'y', 'x']})
+        self.decision = pd.DataFrame({'t': ['0', '1', '0', '1']})
+        self.desired_state = DesiredState(desired_classes=['1'])
+
+    def test_find_pairs_not_nan(self):
+        pair_matching = PairMatching(self.desired_state)
+        result = pair_matching.find_pairs(self.stable, self.flexible, self.decision,
+                                          np.array([0]), np.array([1, 2, 3]))
+        expected = [(0, 1)]
+        self.assertEqual(expected, result)
+
+    def test_find_pairs_not_nan_missing_value(self):
+        pair_matching = PairMatching(self.desired_state)
+        result = pair_matching.find_pairs(self.stable, self.flexible, self.decision,
+                                          np.array([2]), np.array([1, 3]))
+        expected = []
+        self.assertEqual(expected, result)
+
+    def test_find_pairs_nan(self):
+        pair_matching = PairMatching(self.desired_state, is_nan=True)
+        result = pair_matching.find_pairs(self.stable, self.flexible, self.decision,
+                                          np.array([2]), np.array([1, 3]))
+        expected = [(2, 3)]
+        self.assertEqual(expected, result)
+
+    def test_find_pairs_nan_used_pairs(self):
+        pair_matching = PairMatching(self.desired_state, is_nan=True)
+        pair_matching.set_pair_keys(self.decision.index)
+        pair_matching.find_pairs(self.stable, self.flexible, self.decision, np.array([0]), np.array([1]))
+        result = pair_matching.find_pairs(self.stable, self.flexible, self.decision, np.array([0]), np.array([1]))
+        expected = []
+        self.assertEqual(expected, result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+from .testReduction import TestReduction
@@ -0,0 +1,65 @@
+import itertools
+import unittest
+import pandas as pd
+
+from actionrules.actionRules import ActionRules
+from actionrules.decisions import Decisions
+from actionrules.desiredState import DesiredState
+from actionrules.reduction import Reduction
+
+
+class TestReduction(unittest.TestCase):
+    def setUp(self):
+        self.stable = pd.DataFrame({'a': ['x', 'x', 'y', 'y', 'nan', 'nan', 'y', 'x'],
+                                    'b': ['1', '2', '1', 'nan', '1', '2', '1', '1']})
+        self.flexible = pd.DataFrame({'c': ['p', 'q', 'p', 'q', 'q', 'p', 'q', 'p']})
+        self.decision = pd.DataFrame({'d': ['yes', 'yes', 'no', 'yes', 'yes', 'no', 'yes', 'no']})
+
+    def _reduce(self, is_nan: bool) -> Reduction:
+        reduction = Reduction(self.stable, self.flexible, self.decision, DesiredState(desired_classes=['yes']),
+                              [0.1] * 8, [0.9] * 8, is_nan)
+        reduction.reduce()
+        return reduction
+
+    def _get_rows(self, reduction: Reduction) -> list:
+        return [sorted(int(row) for segment_id in partition for row in reduction.segments[segment_id])
+                for partition in reduction.partitions]
+
+    def test_reduce_when_not_nan(self):
+        result = self._get_rows(self._reduce(False))
+        # rows of the tables from the reduction by copied data frames
+        expected = [[0, 7], [2, 6]]
+        self.assertEqual(expected, result)
+
+    def test_reduce_when_nan(self):
+        reduction = self._reduce(True)
+        result = self._get_rows(reduction)
+        # rows of the tables from the reduction by copied data frames, rows with nan are in more tables
+        expected = [[0, 4, 7], [1, 5], [2, 3, 4, 6], [3, 5]]
+        self.assertEqual(expected, result)
+        # the segments are disjoint, the rows with nan are shared as segments
+        rows = [int(row) for segment in reduction.segments for row in segment]
+        self.assertEqual(len(set(rows)), len(rows))
+        shared = [segment_id for segment_id in range(len(reduction.segments))
+                  if sum(segment_id in partition for partition in reduction.partitions) > 1]
+        self.assertEqual([[3], [4], [5]], sorted(reduction.segments[segment_id].tolist() for segment_id in shared))
+
+    def test_get_new_segment_pairs(self):
+        reduction = self._reduce(True)
+        action_rules = ActionRules([pd.DataFrame()], [pd.DataFrame()], [pd.DataFrame()], DesiredState(),
+                                   Decisions(), [pd.Series()], [pd.Series()], True)
+        result = []
+        for partition in reduction.partitions:
+            new_pairs = action_rules._get_new_segment_pairs(partition)
+            for before, after in zip(*new_pairs.nonzero()):
+                result.extend(itertools.product(reduction.segments[partition[before]].tolist(),
+                                                reduction.segments[partition[after]].tolist()))
+        # every pair of rows from the tables is used once
+        expected = set()
+        for rows in self._get_rows(reduction):
+            expected.update(itertools.product(rows, rows))
+        self.assertEqual(len(set(result)), len(result))
+        self.assertEqual(expected, set(result))
+
+if __name__ == '__main__':
+    unittest.main()
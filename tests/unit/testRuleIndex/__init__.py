@@ -0,0 +1 @@
+from .testRuleIndex import TestRuleIndex
@@ -0,0 +1,26 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from actionrules.encoding import Encoding
+from actionrules.ruleIndex import RuleIndex
+
+
+class TestRuleIndex(unittest.TestCase):
+    def setUp(self):
+        self.encoding = Encoding()
+        self.encoding.fit(pd.DataFrame({'a': ['x', 'y'], 'b': ['1', '2']}))
+        conditions = pd.DataFrame({'a': ['x', 'y', 'x', np.nan],
+                                   'b': ['1', '1', '1', '2']})
+        self.rule_index = RuleIndex(conditions, self.encoding)
+
+    def test_match(self):
+        source_table = pd.DataFrame({'a': ['x', 'y', 'z', 'x'], 'b': ['1', '2', '1', 'nan']})
+        row_positions, rule_ids = self.rule_index.match(source_table)
+        # rules 0 and 2 have the same conditions, rule 3 has no condition on a
+        result = list(zip(rule_ids.tolist(), row_positions.tolist()))
+        expected = [(0, 0), (2, 0), (3, 1)]
+        self.assertEqual(expected, result)
+
+if __name__ == '__main__':
+    unittest.main()